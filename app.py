@@ -1,29 +1,30 @@
 # app.py
 
 import os
-import sys
-import time
+import atexit
 import json
 import threading
 import webbrowser
 
-import xlwings as xw
 import pandas as pd
 from flask import (
     Flask, render_template, request,
-    send_file, session, jsonify
+    send_file, session, jsonify, Response
 )
 from icecream import ic
 
 from utils.general import clean_local_path, load_yml_to_args, load_yml, resource_path
-from utils.excel_utils import load_excel_wb, onedrive_url_to_iframe, finalize, convert_cell_string_to_coor
+from utils.excel_utils import onedrive_url_to_iframe, convert_cell_string_to_coor
 from utils.logger import Logger
 from utils.configs import Config
 from utils.registry import registry
 from utils.session import switch_current
-from utils.chatbot import get_correction_results
 from projects.agent.agent_checker import GramCheckerAgent
+from projects.modules.retry import IncompleteCheckError
 from utils.history_handler import HistoryHandler
+from utils.job_manager import GrammarJobManager, JobConflictError
+from utils.incremental_check import get_recheck_cells, iter_recheck
+from utils.workbook_cache import WorkbookCache
 
 
 # ===== Basic Config =====
@@ -65,7 +66,22 @@ app = Flask(
 app.secret_key = "supersecret"
 
 agent_checker = GramCheckerAgent()
+# The HTTP client and the event loop are shared by every request, closed once at interpreter exit
+atexit.register(agent_checker.close)
 history_handler = HistoryHandler()
+workbook_cache_config = system.config.config_base.get("workbook_cache", {})
+workbook_cache = WorkbookCache(
+    enable=workbook_cache_config.get("enable", True),
+    max_bytes=workbook_cache_config.get("max_mb", 512) * 1024 * 1024,
+    max_entries=workbook_cache_config.get("max_entries", 16)
+)
+job_manager = GrammarJobManager(
+    agent=agent_checker,
+    history_handler=history_handler,
+    writer=writer,
+    max_workers=system.config.config_base.get("jobs", {}).get("max_workers", 2),
+    workbook_cache=workbook_cache
+)
 
 
 # ===== Routes =====
@@ -94,22 +110,22 @@ def upload():
     elif not os.path.isfile(local_path):
         error_message = "Please enter a valid local path"
     else:
-        wb = load_excel_wb(local_path)
+        sheet_names = workbook_cache.get_sheet_names(local_path)
         session.update({
             "current_excel_file_path": local_path,
             "current_excel_url": excel_url,
-            "sheet_names": wb.sheetnames,
-            "current_sheet_name": wb.sheetnames[0],
+            "sheet_names": sheet_names,
+            "current_sheet_name": sheet_names[0],
             "current_iframe": onedrive_url_to_iframe(
                 url=excel_url,
-                sheetname=wb.sheetnames[0]
+                sheetname=sheet_names[0]
             )
         })
         history_handler.add_file_information(
             local_path=local_path,
             online_url=excel_url,
             iframe=session["current_iframe"],
-            sheetnames=wb.sheetnames
+            sheetnames=sheet_names
         )
 
     all_current_files = history_handler.get_all_current_files()
@@ -231,15 +247,19 @@ def change_sheet_cell():
     new_value = data.get("new_value")
 
     if old_value != new_value:
-        wb = xw.Book(session["current_excel_file_path"])
-        current_sheet = wb.sheets[session["current_sheet_name"]]
-        agent_checker.change_sheet_cell(
-            sheet=current_sheet,
-            cell_address=cell,
-            old_value=old_value,
-            new_value=new_value
-        )
-        finalize(wb)
+        cell_writer = agent_checker.open_cell_writer(session["current_excel_file_path"])
+        try:
+            agent_checker.change_sheet_cell(
+                cell_writer=cell_writer,
+                sheet_name=session["current_sheet_name"],
+                cell_address=cell,
+                old_value=old_value,
+                new_value=new_value
+            )
+            cell_writer.save()
+        finally:
+            cell_writer.close()
+            workbook_cache.invalidate(session["current_excel_file_path"])
 
     return jsonify({
         "iframe": session.get("current_iframe", ""),
@@ -247,6 +267,41 @@ def change_sheet_cell():
     })
 
 
+@app.route("/apply_corrections", methods=["POST"])
+def apply_corrections():
+    """Apply every non-rejected correction of a sheet (or of the workbook without sheet_name), streaming progress as NDJSON."""
+    if "current_excel_file_path" not in session:
+        return jsonify({"error": "No file selected"}), 400
+
+    data = request.get_json(silent=True) or {}
+    sheet_name = data.get("sheet_name")
+    local_path = session["current_excel_file_path"]
+    iframe = session.get("current_iframe", "")
+
+    file_id = history_handler.get_file_id(local_path)
+    corrections = history_handler.get_accepted_corrections(file_id, sheet_name=sheet_name)
+    writer.LOG_INFO(f"Start applying {len(corrections)} corrections")
+
+    def generate():
+        # One open workbook and a single save for every cell
+        cell_writer = agent_checker.open_cell_writer(local_path)
+        try:
+            for report in agent_checker.iter_apply_corrections(cell_writer, corrections):
+                yield json.dumps({"type": "progress", **report}) + "\n"
+            cell_writer.save()
+        except Exception as e:
+            writer.LOG_ERROR(f"Applying corrections failed: {str(e)}")
+            yield json.dumps({"type": "error", "error": str(e)}) + "\n"
+            return
+        finally:
+            cell_writer.close()
+            workbook_cache.invalidate(local_path)
+
+        yield json.dumps({"type": "done", "iframe": iframe}) + "\n"
+
+    return Response(generate(), mimetype="application/x-ndjson")
+
+
 @app.route("/download_excel")
 def download_excel():
     """Download the currently selected Excel file."""
@@ -261,31 +316,143 @@ def check_grammar():
     data = request.get_json()
     request_sheet_name = data["sheet_name"]
 
-    wb = load_excel_wb(path=session["current_excel_file_path"])
-    rows = [row for row in wb[request_sheet_name].iter_rows(values_only=True)]
-    checked_rows = agent_checker.run_sheet(rows)
-
-    results = get_correction_results(old_rows=rows, new_rows=checked_rows)
-    file_id = history_handler.get_file_id(session["current_excel_file_path"])
+    local_path = session["current_excel_file_path"]
+    file_id = history_handler.get_file_id(local_path)
 
-    # Delete First then add
-    history_handler.delete_correction_history(file_id)
-    for result in results:
-        history_handler.add_correction_history(
-            file_id=file_id,
-            sheet_name=session["current_sheet_name"],
-            coordinates=result["coordinates"],
-            old_value=result["old_value"],
-            new_value=result["new_value"]
-        )
+    # Only new or modified cells are sent, the others keep their corrections and reject status
+    text_cells = get_recheck_cells(
+        history_handler,
+        file_id,
+        workbook_cache.iter_text_cells(local_path, [request_sheet_name]),
+        [request_sheet_name]
+    )
+    error = None
+    try:
+        for _ in iter_recheck(agent_checker, history_handler, file_id, text_cells):
+            pass
+    except IncompleteCheckError as e:
+        # Batches that succeeded are already recorded, the failed cells are checked again next time
+        writer.LOG_ERROR(f"Grammar check incomplete: {str(e)}")
+        error = str(e)
+    results = history_handler.get_correction_history_info(
+        local_path=local_path,
+        sheet_name=request_sheet_name
+    )
 
     writer.LOG_INFO("Finish Checking Grammar")
     return jsonify({
         "iframe": session.get("current_iframe", ""),
-        "results": results
+        "results": results,
+        "error": error
     })
 
 
+@app.route("/submit_grammar_job", methods=["POST"])
+def submit_grammar_job():
+    """Queue a grammar check of a sheet, the check runs in the background worker pool."""
+    if "current_excel_file_path" not in session:
+        return jsonify({"error": "No file selected"}), 400
+
+    data = request.get_json()
+    try:
+        job_id = job_manager.submit(
+            local_path=session["current_excel_file_path"],
+            sheet_name=data["sheet_name"]
+        )
+    except JobConflictError as e:
+        return jsonify({"error": str(e), "job_id": e.job_id}), 409
+    return jsonify({"job_id": job_id}), 202
+
+
+@app.route("/submit_workbook_job", methods=["POST"])
+def submit_workbook_job():
+    """Queue a grammar check of every sheet of the current workbook as one pipeline."""
+    if "current_excel_file_path" not in session:
+        return jsonify({"error": "No file selected"}), 400
+
+    try:
+        job_id = job_manager.submit(local_path=session["current_excel_file_path"])
+    except JobConflictError as e:
+        return jsonify({"error": str(e), "job_id": e.job_id}), 409
+    return jsonify({"job_id": job_id}), 202
+
+
+@app.route("/grammar_job_status", methods=["GET"])
+def grammar_job_status():
+    """Report progress of a job (batches done/total, cells corrected, ETA)."""
+    job_id = request.args.get("job_id")
+    if job_id:
+        progress = job_manager.get_progress(job_id)
+        if progress is None:
+            return jsonify({"error": f"Unknown job {job_id}"}), 404
+        return jsonify(progress)
+
+    if "current_excel_file_path" not in session:
+        return jsonify({"error": "No file selected"}), 400
+    file_id = history_handler.get_file_id(session["current_excel_file_path"])
+    return jsonify({"jobs": history_handler.get_file_jobs(file_id)})
+
+
+@app.route("/cancel_grammar_job", methods=["POST"])
+def cancel_grammar_job():
+    """Cancel a queued or running job, its pending batches are aborted."""
+    job_id = request.get_json().get("job_id")
+    if not job_manager.cancel(job_id):
+        return jsonify({"error": f"Job {job_id} is not queued or running"}), 404
+    return jsonify({"job_id": job_id, "status": "cancelling"})
+
+
+@app.route("/agent_status", methods=["GET"])
+def agent_status():
+    """Report the LLM request controllers (concurrency window, in-flight requests)."""
+    return jsonify({**agent_checker.get_status(), "workbook_cache": workbook_cache.get_state()})
+
+
+@app.route("/check_grammar_stream", methods=["POST"])
+def check_grammar_stream():
+    """Check grammar for the current sheet, streaming each batch's corrections as NDJSON."""
+    writer.LOG_INFO("Start Checking Grammar (stream)")
+
+    data = request.get_json()
+    request_sheet_name = data["sheet_name"]
+    local_path = session["current_excel_file_path"]
+    iframe = session.get("current_iframe", "")
+
+    file_id = history_handler.get_file_id(local_path)
+
+    def generate():
+        try:
+            # Unchanged cells keep their corrections, they are sent first
+            text_cells = get_recheck_cells(
+                history_handler,
+                file_id,
+                workbook_cache.iter_text_cells(local_path, [request_sheet_name]),
+                [request_sheet_name]
+            )
+            kept_results = history_handler.get_correction_history_info(
+                local_path=local_path,
+                sheet_name=request_sheet_name
+            )
+            yield json.dumps({
+                "type": "corrections",
+                "results": kept_results,
+                "batches_done": 0,
+                "batches_total": None
+            }, default=str) + "\n"
+
+            for chunk in iter_recheck(agent_checker, history_handler, file_id, text_cells):
+                yield json.dumps({"type": "corrections", **chunk}, default=str) + "\n"
+        except Exception as e:
+            writer.LOG_ERROR(f"Grammar stream failed: {str(e)}")
+            yield json.dumps({"type": "error", "error": str(e)}) + "\n"
+            return
+
+        writer.LOG_INFO("Finish Checking Grammar (stream)")
+        yield json.dumps({"type": "done", "iframe": iframe}) + "\n"
+
+    return Response(generate(), mimetype="application/x-ndjson")
+
+
 @app.route("/export_correction", methods=["POST"])
 def export_correction():
     """EXPORT CORRECTION FOR EXCEL FILE"""
@@ -6,6 +6,7 @@ import re
 import time
 
 #-- From
+import httpx
 from tqdm import tqdm
 from typing import Dict, Any, Optional, Tuple, List
 from icecream import ic
@@ -27,6 +28,7 @@ from projects.modules.chatprompt import ConversationChatPromptCreator, SchemaCre
 # from chatbot.modules.knowledge_graph import KnowledgeGraphSource
 from utils.registry import registry
 from utils.general import save_json
+from utils.logger import Logger
 
 
 #==== ENVIRONMENT VARIABLES  ====
@@ -54,29 +56,51 @@ class BaseAgent:
     #-- BUILD
     def load_config(self):
         #-- Header
+        #-- Agent settings from config.yaml
+        self.config_base = registry.get_config("base") or {}
+        self.config_general = registry.get_config("general") or {}
+        self.agent_config = self.config_base.get("agent", {})
+
         self.llm_config = {
             "openai_api_key": API_KEY,
             "openai_api_version": API_VERSION,
             "azure_endpoint": AZURE_ENDPOINT,
             "azure_deployment": AZURE_DEVELOPMENT,
-            "temperature": 0.0
+            "temperature": 0.0,
+            "max_retries": self.agent_config.get("llm", {}).get("max_retries", 2)
         }
 
     # def load_model(self):
     #     self.gpt_llm = AzureChatOpenAI(**self.llm_config)
     
     def load_model(self):
+        self.http_async_client = self.build_http_async_client()
         self.gpt_llm = AzureChatOpenAI(
             openai_api_key=self.llm_config["openai_api_key"],
             openai_api_version=self.llm_config["openai_api_version"],
             azure_endpoint=self.llm_config["azure_endpoint"],
             azure_deployment=self.llm_config["azure_deployment"],
-            temperature=self.llm_config["temperature"]
+            temperature=self.llm_config["temperature"],
+            max_retries=self.llm_config["max_retries"],
+            http_async_client=self.http_async_client
+        )
+
+    def build_http_async_client(self):
+        """One keep-alive connection pool to Azure, shared by every async call of the agent"""
+        http_config = self.agent_config.get("http", {})
+        return httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=http_config.get("max_connections", 32),
+                max_keepalive_connections=http_config.get("max_keepalive_connections", 16),
+                keepalive_expiry=http_config.get("keepalive_expiry", 60.0)
+            ),
+            timeout=httpx.Timeout(http_config.get("timeout", 120.0), connect=http_config.get("connect_timeout", 10.0))
         )
 
     def build_modules(self):
         self.prompt_creator = ConversationChatPromptCreator()
         self.schema_creator = SchemaCreator()
+        self.writer = registry.get_writer("common") or Logger(name="general")
 
     def create_fixed_chain(self):
         self.chain = self.gpt_llm
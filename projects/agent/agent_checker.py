@@ -1,23 +1,38 @@
 from projects.agent.agent_base import BaseAgent
-from langchain.chains import LLMChain
-from tqdm import tqdm
-from typing import List
-from icecream import ic
-import openpyxl
+from typing import List, Dict
 import json
+import time
 import asyncio
-import nest_asyncio
-import re
+import threading
 import numpy as np
-from langchain_core.prompts import ChatPromptTemplate, PromptTemplate
+from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import JsonOutputParser
-from langchain_core.runnables import RunnableSequence, RunnableLambda
+from langchain_core.exceptions import OutputParserException
+from langchain_core.runnables import RunnableLambda
+from projects.modules.batcher import TokenBudgetBatcher, estimate_tokens
+from projects.modules.concurrency import AIMDConcurrencyController, get_retry_after
+from projects.modules.retry import (
+    RetryPolicy,
+    CircuitBreaker,
+    CircuitOpenError,
+    IncompleteCheckError,
+    is_retryable_error,
+    is_outage_error
+)
+from projects.modules.rate_limiter import get_shared_limiter
+from projects.modules.prefilter import ProsePrefilter
+from projects.modules.json_repair import LocalJsonRepairer
+from projects.modules.textsplitter import TextSplitter
+from projects.modules.event_loop import BackgroundEventLoop
+from projects.modules.word_aligner import find_common_runs, get_common_missing_idx
+from projects.modules.style_transfer import StyleTransfer
+from projects.modules.cell_writer import CELL_WRITERS
+from utils.correction_cache import CorrectionCache
+from utils.general import normalize_text, restore_padding
+from utils.workbook_cache import WorkbookCache
 
 
 
-nest_asyncio.apply()
-semaphore = asyncio.Semaphore(8) 
-
 class GramCheckerAgent(BaseAgent):
     ROW_GRAMMAR_CHECK_SYSTEM = """
         You are an English proofreader and editor.
@@ -57,31 +72,204 @@ class GramCheckerAgent(BaseAgent):
         {input_list_text}
     """
 
+    #~ Diff-only protocol: the model answers with the changed texts only, the agent rebuilds the rest
+    ROW_GRAMMAR_CHECK_DIFF_INSTRUCTION = """
+        ### Instructions:
+        You are given a list of texts. Your task is to check and improve each text based on grammar, spelling, and readability, while ensuring that NO content or elements from the original text are deleted or removed.
+
+        ### Rules:
+        1. For each text in the input list:
+            - Correct only **grammar**, **spelling**, and incorrect **word usage**.
+            - Keep all spacing, line breaks ("\\n"), and special symbols as they appear in the original.
+
+        2. Return ONLY the texts that needed a correction. Texts without any issue must NOT appear in the output.
+
+        3. Output as a **structured JSON format** that JsonOutputParser can parsed.
+
+        ### Notes:
+            - Do NOT add or remove any content, words, or symbols.
+            - Do NOT correct the error related to symbols or whitespace.
+            - If every text is correct, output {{"changes": []}}.
+
+        ### Output format:
+        {{
+            "changes": [
+                {{
+                    "text_id" (int): <ID of a corrected input text>,
+                    "fixed_text" (str): <corrected and improved text>
+                }},
+                ...
+            ]
+        }}
+
+        ### Input:
+        {input_list_text}
+    """
+
+    RESPONSE_MODES = ("full", "diff")
+
 
     def __init__(self):
         super().__init__()
+        #~ Every coroutine of the agent runs on this loop, where the pooled HTTP client lives
+        self.event_loop = BackgroundEventLoop()
+        self.response_mode = self.agent_config.get("response_mode", "full")
+        if self.response_mode not in self.RESPONSE_MODES:
+            raise ValueError(f"Unknown response_mode {self.response_mode}, expected one of {self.RESPONSE_MODES}")
+        self.llm_usage = {"requests": 0, "input_tokens": 0, "output_tokens": 0, "latency_seconds": 0.0}
+        self.llm_usage_lock = threading.Lock()
+        self.style_transfer = StyleTransfer()
+        self.build_cell_writer()
+        self.build_cache()
+        self.build_prefilter()
+        self.build_splitter()
+        self.build_batcher()
+        self.build_concurrency()
+        self.build_retry()
+        self.build_rate_limiter()
         self.create_fixed_chain()
 
 
+    def build_cell_writer(self):
+        cell_writer_config = self.agent_config.get("cell_writer", {})
+        self.cell_writer_backend = cell_writer_config.get("backend", "xlwings")
+        if self.cell_writer_backend not in CELL_WRITERS:
+            raise ValueError(f"Unknown cell_writer backend {self.cell_writer_backend}, expected one of {tuple(CELL_WRITERS)}")
+
+
+    def build_cache(self):
+        cache_config = self.agent_config.get("correction_cache", {})
+        self.correction_cache = None
+        if cache_config.get("enable", True):
+            self.correction_cache = CorrectionCache(
+                name=cache_config.get("name", "correction_cache"),
+                save_dir=self.config_general.get("save_dir", "save"),
+                max_entries=cache_config.get("max_entries", 200000),
+                max_age_days=cache_config.get("max_age_days", 30)
+            )
+
+
+    def build_prefilter(self):
+        prefilter_config = self.agent_config.get("prefilter", {})
+        self.prefilter = None
+        if prefilter_config.get("enable", True):
+            self.prefilter = ProsePrefilter(
+                rules=prefilter_config.get("rules"),
+                patterns=prefilter_config.get("patterns"),
+                min_letters=prefilter_config.get("min_letters", 2),
+                min_letter_ratio=prefilter_config.get("min_letter_ratio", 0.5)
+            )
+
+
+    def build_splitter(self):
+        chunking_config = self.agent_config.get("chunking", {})
+        self.text_splitter = None
+        if chunking_config.get("enable", True):
+            self.text_splitter = TextSplitter(chunk_size=chunking_config.get("max_chars", 1500))
+
+
+    def build_batcher(self):
+        batching_config = self.agent_config.get("batching", {})
+        chars_per_token = batching_config.get("chars_per_token", 4.0)
+        self.batcher = TokenBudgetBatcher(
+            max_batch_tokens=batching_config.get("max_batch_tokens", 6000),
+            max_batch_items=batching_config.get("max_batch_items", 15),
+            prompt_tokens=estimate_tokens(
+                self.get_prompt(),
+                chars_per_token
+            ),
+            output_ratio=batching_config.get("output_ratio", 2.0),
+            item_overhead_tokens=batching_config.get("item_overhead_tokens", 12),
+            chars_per_token=chars_per_token
+        )
+
+
+    def build_concurrency(self):
+        concurrency_config = self.agent_config.get("concurrency", {})
+        self.concurrency = AIMDConcurrencyController(
+            min_concurrency=concurrency_config.get("min_concurrency", 1),
+            max_concurrency=concurrency_config.get("max_concurrency", 16),
+            initial_concurrency=concurrency_config.get("initial_concurrency", 4),
+            additive_increase=concurrency_config.get("additive_increase", 1.0),
+            multiplicative_decrease=concurrency_config.get("multiplicative_decrease", 0.5)
+        )
+        self.max_alignment_retries = concurrency_config.get("max_alignment_retries", 2)
+
+        pipeline_config = self.agent_config.get("pipeline", {})
+        self.pipeline_workers = pipeline_config.get("workers", self.concurrency.max_concurrency)
+        self.pipeline_queue_size = pipeline_config.get("queue_size", 2 * self.pipeline_workers)
+
+
+    def build_retry(self):
+        retry_config = self.agent_config.get("retry", {})
+        self.retry_policy = RetryPolicy(
+            max_retries=retry_config.get("max_retries", 5),
+            base_delay=retry_config.get("base_delay", 0.5),
+            max_delay=retry_config.get("max_delay", 30.0)
+        )
+        self.circuit_breaker = CircuitBreaker(
+            failure_threshold=retry_config.get("failure_threshold", 5),
+            reset_timeout=retry_config.get("reset_timeout", 30.0)
+        )
+
+
+    def build_rate_limiter(self):
+        rate_limit_config = self.agent_config.get("rate_limit", {})
+        self.rate_limiter = None
+        if rate_limit_config.get("enable", True):
+            self.rate_limiter = get_shared_limiter(
+                name=self.llm_config["azure_deployment"],
+                tokens_per_minute=rate_limit_config.get("tokens_per_minute", 120000),
+                requests_per_minute=rate_limit_config.get("requests_per_minute", 720)
+            )
+
+
+    def get_status(self):
+        return {
+            "concurrency": self.concurrency.get_state(),
+            "rate_limit": self.rate_limiter.get_state() if self.rate_limiter is not None else None,
+            "llm_usage": self.get_llm_usage(),
+            "json_repair": self.json_repairer.get_counts(),
+            "circuit_breaker": self.circuit_breaker.get_state(),
+            "style_transfer": self.style_transfer.get_counts()
+        }
+
+
+    def get_prompt(self):
+        if self.response_mode == "diff":
+            return self.ROW_GRAMMAR_CHECK_SYSTEM + self.ROW_GRAMMAR_CHECK_DIFF_INSTRUCTION
+        return self.ROW_GRAMMAR_CHECK_SYSTEM + self.ROW_GRAMMAR_CHECK_INSTRUCTION
+
+
+    def make_cache_key(self, text):
+        return self.correction_cache.make_key(
+            text=text,
+            prompt=self.get_prompt(),
+            deployment=self.llm_config["azure_deployment"]
+        )
+
+
     #-- Grammar Checker
     def create_fixed_chain(self):
-        ROW_GRAMMAR_CHECK_PROMPT = self.ROW_GRAMMAR_CHECK_SYSTEM + self.ROW_GRAMMAR_CHECK_INSTRUCTION
+        ROW_GRAMMAR_CHECK_PROMPT = self.get_prompt()
         ROW_GRAMMAR_CHECK_PROMPT_TEMPLATE = PromptTemplate(
             template=ROW_GRAMMAR_CHECK_PROMPT,
             input_variables=["input_list_text"]
         )
 
-        sanitize_step = RunnableLambda(lambda x: self.sanitize_json(x))
-        parser = JsonOutputParser()
-        self.chain = (
-            ROW_GRAMMAR_CHECK_PROMPT_TEMPLATE
-            | self.gpt_llm
-            | parser       
-        )
+        #~ Deterministic repair first, the LLM fixing parser (if enabled) only sees what it could not mend
+        self.json_repairer = LocalJsonRepairer()
+        json_parser = JsonOutputParser()
+        if self.agent_config.get("json_repair", {}).get("llm_fallback", False):
+            json_parser = self.get_output_parser(parser_type="json")
+        self.output_parser = RunnableLambda(self.json_repairer.repair_message) | json_parser
+        #~ The raw LLM message is kept apart from parsing to read its token usage
+        self.llm_chain = ROW_GRAMMAR_CHECK_PROMPT_TEMPLATE | self.gpt_llm
+        self.chain = self.llm_chain | self.output_parser
         # self.chain = ROW_GRAMMAR_CHECK_PROMPT_TEMPLATE | self.gpt_llm | parser
 
 
-    async def check_list(self, list_texts):
+    async def check_list(self, list_texts, estimated_tokens=None):
         def format_input_to_json(list_texts):
             rewrite_list_texts = []
             for id, text in enumerate(list_texts):
@@ -92,7 +280,15 @@ class GramCheckerAgent(BaseAgent):
             return rewrite_list_texts
 
         rewrite_list_texts = format_input_to_json(list_texts)
-        response = await self.chain.ainvoke({"input_list_text": rewrite_list_texts})
+        message = await self.invoke_llm({"input_list_text": rewrite_list_texts}, estimated_tokens)
+        try:
+            response = await self.output_parser.ainvoke(message)
+        except OutputParserException as error:
+            #~ Every item of the batch counts as missing and is sent again
+            self.writer.LOG_WARNING(f"Unparsable batch answer: {str(error)[:200]}")
+            return []
+        if self.response_mode == "diff":
+            return self.expand_diff_response(response, list_texts)
 
         if "text" in response:
             response = response["text"]
@@ -101,226 +297,671 @@ class GramCheckerAgent(BaseAgent):
         return response
 
 
-    async def corrected_sheet(self, rows, batch_size=15):
-        if not isinstance(rows, np.ndarray):
-            rows = np.array(rows, dtype=object)
-
-        org_shape = rows.shape
-        flatten_rows = rows.flatten()
-        non_nan_indices  = [i for i, v in enumerate(flatten_rows) if v is not None]
-        non_nan_rows = flatten_rows[non_nan_indices]
-
-        async def limited_check(list_texts):
-            async with semaphore:
-                await asyncio.sleep(0.4)
-                return await self.check_list(list_texts)
-
-        #-- Batch iteration
-        tasks = []
-        all_indices = []
-        for start_idx in range(0, len(non_nan_rows), batch_size):
-            batch_non_nan_rows = non_nan_rows[start_idx: start_idx + batch_size]
-            batch_non_nan_indices = non_nan_indices [start_idx: start_idx + batch_size]
-            all_indices.extend(batch_non_nan_indices)
-            tasks.append(limited_check(list_texts=batch_non_nan_rows))
-            
-        all_batch_responses = await asyncio.gather(*tasks)
-        all_responses = [response for batch_responses in all_batch_responses for response in batch_responses]
-
-        for idx, response in zip(all_indices, all_responses):
-            if not response["status"]:
-                if "text" in response:
-                    response = response["text"]
-                if "data" in response:
-                    response = response["data"]
-                if not str(response["fixed_text"]).strip() == str(response["original_text"]).strip():
-                    flatten_rows[idx] = response["fixed_text"]
-        new_rows = flatten_rows.reshape(org_shape)
-        return new_rows
-
-
-
-    async def check_all_sheet(self, wb):
-        sheet_names = wb.sheetnames
-        tasks = []
-        for sheet_name in sheet_names:
-            sheet = wb[sheet_name]
-            rows = [np.array(row) for row in sheet.iter_rows(values_only=True)]
-            tasks.append(corrected_sheet(rows))
-        new_sheets = await asyncio.gather(*tasks)
-        return new_sheets
+    def expand_diff_response(self, response, list_texts):
+        """
+        Rebuild one full item per input text from a diff-only answer, texts missing from "changes" are correct
+
+        Returns:
+            List[dict]: {"text_id", "status", "fixed_text", "original_text"} in input order, as in the full protocol
+        """
+        if isinstance(response, dict):
+            response = response.get("changes", response.get("data", []))
+
+        fixed_texts = {}
+        for item in response or []:
+            try:
+                text_id = int(item["text_id"])
+            except (KeyError, TypeError, ValueError):
+                continue
+            if 1 <= text_id <= len(list_texts) and item.get("fixed_text") is not None:
+                fixed_texts[text_id] = item["fixed_text"]
+
+        full_response = []
+        for text_id, text in enumerate(list_texts, start=1):
+            fixed_text = fixed_texts.get(text_id, text)
+            full_response.append({
+                "text_id": text_id,
+                "status": str(fixed_text).strip() == str(text).strip(),
+                "fixed_text": fixed_text,
+                "original_text": text
+            })
+        return full_response
+
+
+    def align_response(self, response, list_texts):
+        """
+        Match response items to the input texts by `text_id`, never by position
+
+        An item is rejected when its id is unknown or repeated, its status or fixed text is
+        missing, or its echoed original text is not the input text.
+
+        Returns:
+            List[dict | None]: One item per input text, None where no valid item was returned
+        """
+        aligned = [None] * len(list_texts)
+        rejected_ids = set()
+        for item in response if isinstance(response, list) else []:
+            try:
+                text_id = int(item["text_id"])
+                status = item["status"]
+            except (KeyError, TypeError, ValueError):
+                continue
+            if not 1 <= text_id <= len(list_texts) or text_id in rejected_ids:
+                continue
+            if aligned[text_id - 1] is not None:
+                #~ The same id twice, no way to tell which one is right
+                aligned[text_id - 1] = None
+                rejected_ids.add(text_id)
+                continue
+
+            original_text = item.get("original_text")
+            if original_text and " ".join(normalize_text(original_text).split()) != " ".join(normalize_text(list_texts[text_id - 1]).split()):
+                continue
+            if not status and not isinstance(item.get("fixed_text"), str):
+                continue
+            aligned[text_id - 1] = item
+        return aligned
+
+
+    async def call_llm(self, inputs):
+        started_at = time.monotonic()
+        message = await self.llm_chain.ainvoke(inputs)
+        latency = time.monotonic() - started_at
+
+        usage = getattr(message, "usage_metadata", None) or {}
+        with self.llm_usage_lock:
+            self.llm_usage["requests"] += 1
+            self.llm_usage["input_tokens"] += usage.get("input_tokens", 0)
+            self.llm_usage["output_tokens"] += usage.get("output_tokens", 0)
+            self.llm_usage["latency_seconds"] += latency
+        return message
+
+
+    def get_llm_usage(self):
+        """Token and latency totals of the successful LLM calls, to compare response modes"""
+        with self.llm_usage_lock:
+            usage = dict(self.llm_usage)
+        usage["response_mode"] = self.response_mode
+        usage["latency_seconds"] = round(usage["latency_seconds"], 3)
+        usage["mean_latency_seconds"] = round(usage["latency_seconds"] / usage["requests"], 3) if usage["requests"] else None
+        usage["mean_output_tokens"] = round(usage["output_tokens"] / usage["requests"], 1) if usage["requests"] else None
+        return usage
+
+
+    async def reserve_quota(self, list_texts):
+        """
+        Wait for the TPM/RPM quota of one batch and charge it up front
+
+        Returns:
+            int | None: Charged tokens, to hand to `invoke_llm`, None without rate limiter
+        """
+        if self.rate_limiter is None:
+            return None
+        estimated_tokens = self.batcher.estimate_batch_tokens(list_texts)
+        await self.rate_limiter.acquire(estimated_tokens)
+        return estimated_tokens
+
+
+    def release_quota(self, estimated_tokens):
+        """Give back the charge of a batch that was never sent"""
+        if estimated_tokens is not None:
+            self.rate_limiter.cancel(estimated_tokens)
+
+
+    async def invoke_llm(self, inputs, estimated_tokens=None):
+        """Call the LLM, the quota charge taken by `reserve_quota` is reconciled with the reported usage"""
+        if estimated_tokens is None:
+            return await self.call_llm(inputs)
 
-    
-    def run_all_sheet(self, excel_path: str, is_saved):
+        try:
+            message = await self.call_llm(inputs)
+        except Exception as error:
+            if getattr(error, "status_code", None) == 429:
+                self.rate_limiter.cancel(estimated_tokens)
+            raise
+
+        usage = getattr(message, "usage_metadata", None) or {}
+        actual_tokens = usage.get("total_tokens")
+        if actual_tokens is not None:
+            self.rate_limiter.reconcile(estimated_tokens, actual_tokens)
+        return message
+
+
+    async def iter_cell_corrections(self, cells, batch_size=None):
+        """
+        Check an arbitrary set of cells, grouped by value before `iter_text_corrections`
+
+        Args:
+            cells (Iterable[Tuple[str, Tuple[int, int], Any]]): (sheet_name, (x, y), value) of every cell to check
+            batch_size (int, optional): Overrides the configured item cap of a batch
+
+        Yields:
+            dict: Same chunks as `iter_text_corrections`
+        """
+        value_groups = {}
+        for sheet_name, coordinates, value in cells:
+            # The type is part of the key, 1, 1.0 and True are equal but are different cells
+            group = value_groups.get((value.__class__, value))
+            if group is None:
+                group = value_groups[(value.__class__, value)] = (value, [])
+            group[1].append((sheet_name, coordinates))
+        async for chunk in self.iter_text_corrections(value_groups.values(), batch_size=batch_size):
+            yield chunk
+
+
+    async def iter_text_corrections(self, text_cells, batch_size=None):
+        """
+        Check an arbitrary set of cells already grouped by text, e.g. the text cells of a workbook
+        scan or only the cells edited since the last run
+
+        Args:
+            text_cells (Iterable[Tuple[Any, List[Tuple[str, Tuple[int, int]]]]]): every text and the (sheet_name, (x, y)) of its cells
+            batch_size (int, optional): Overrides the configured item cap of a batch
+
+        Yields:
+            dict: {
+                "corrections": [{"sheet_name": ..., "coordinates": (x, y), "old_value": ..., "new_value": ...}, ...],
+                "checked_cells": [(sheet_name, (x, y), value), ...],  # every cell resolved by this chunk
+                "batches_done": int,
+                "batches_total": int,
+                "retries": int  # follow-up requests sent for items missing from the batch answer
+            }
+        """
+        group_texts = []
+        group_cells = []
+        for text, cells in text_cells:
+            group_texts.append(text)
+            group_cells.append(cells)
+
+        #-- Pre-filter: numbers, codes and identifiers never reach the LLM, each text is classified once
+        if self.prefilter is not None and len(group_texts):
+            keep_mask, skip_counts = self.prefilter.filter(group_texts)
+            skip_details = ", ".join(f"{rule} {count}" for rule, count in skip_counts.items())
+            self.writer.LOG_INFO(
+                f"Pre-filter: skipped {len(group_texts) - int(keep_mask.sum())}/{len(group_texts)} texts ({skip_details or 'none'})"
+            )
+            group_texts = [text for text, keep in zip(group_texts, keep_mask) if keep]
+            group_cells = [cells for cells, keep in zip(group_cells, keep_mask) if keep]
+
+        cell_sheet_names = []
+        cell_coordinates = []
+        cell_texts = []
+        group_positions = []
+        for text, cells in zip(group_texts, group_cells):
+            group_positions.append(range(len(cell_texts), len(cell_texts) + len(cells)))
+            for sheet_name, coordinates in cells:
+                cell_sheet_names.append(sheet_name)
+                cell_coordinates.append(coordinates)
+                cell_texts.append(text)
+        sheet_count = len(set(cell_sheet_names))
+
+        #-- Deduplicate: every unique normalized text is checked once
+        unique_texts, unique_groups = self.deduplicate_texts(group_texts, group_positions)
+        if len(cell_texts):
+            dedup_ratio = 1 - len(unique_texts) / len(cell_texts)
+            self.writer.LOG_INFO(
+                f"Deduplication: {len(cell_texts)} cells in {sheet_count} sheet(s) -> {len(unique_texts)} unique texts (dedup ratio {dedup_ratio:.1%})"
+            )
+
+        #-- Chunking: oversized texts are checked as several independent items
+        item_texts, item_owners, chunk_layouts = self.split_oversized_texts(unique_texts)
+        if chunk_layouts:
+            self.writer.LOG_INFO(
+                f"Chunking: {len(chunk_layouts)} oversized texts -> {len(item_texts) - len(unique_texts) + len(chunk_layouts)} chunks"
+            )
+
+        #-- Cache lookup: only misses are batched to the LLM
+        cached_corrections = {}
+        miss_positions = list(range(len(item_texts)))
+        if self.correction_cache is not None:
+            cache_keys = [self.make_cache_key(text) for text in item_texts]
+            cache_hits = self.correction_cache.get_many(cache_keys)
+            miss_positions = []
+            for position, cache_key in enumerate(cache_keys):
+                if cache_key in cache_hits:
+                    cached_corrections[position] = cache_hits[cache_key]
+                else:
+                    miss_positions.append(position)
+            self.writer.LOG_INFO(
+                f"Correction cache: {len(item_texts) - len(miss_positions)} hits, {len(miss_positions)} misses"
+            )
+
+        #-- Reassembly: a split text is resolved once all of its chunks are
+        item_results = {}
+        def resolve_items(item_corrections):
+            item_results.update(item_corrections)
+            corrections = {}
+            for item_position, correction in item_corrections.items():
+                owner = item_owners[item_position]
+                layout = chunk_layouts.get(owner)
+                if layout is None:
+                    corrections[owner] = correction
+                elif owner not in corrections and all(position in item_results for _, position, _ in layout):
+                    corrections[owner] = self.join_chunk_corrections(layout, item_texts, item_results)
+            return corrections
+
+        #-- Fan each unique correction back out to every cell holding that text, with the cell's own padding
+        def expand_corrections(corrections, batches_done, retries=0):
+            cell_corrections = []
+            checked_cells = []
+            for position, correction in corrections.items():
+                for cell_position in unique_groups[position]:
+                    original_text = cell_texts[cell_position]
+                    checked_cells.append((cell_sheet_names[cell_position], cell_coordinates[cell_position], original_text))
+                    if correction["status"]:
+                        continue
+                    new_value = restore_padding(original_text, correction["fixed_text"])
+                    if new_value != str(original_text):
+                        cell_corrections.append({
+                            "sheet_name": cell_sheet_names[cell_position],
+                            "coordinates": cell_coordinates[cell_position],
+                            "old_value": original_text,
+                            "new_value": new_value
+                        })
+            return {
+                "corrections": cell_corrections,
+                "checked_cells": checked_cells,
+                "batches_done": batches_done,
+                "batches_total": batches_total,
+                "retries": retries
+            }
+
+        async def resilient_check(list_texts):
+            #~ 429 / 5xx / timeouts back off with jitter and go back behind the controller, other errors are fatal
+            for attempt in range(self.retry_policy.max_retries + 1):
+                self.circuit_breaker.before_call()
+                estimated_tokens = None
+                is_sent = False
+                try:
+                    # The quota wait comes first, a batch waiting for TPM/RPM budget holds no concurrency slot
+                    estimated_tokens = await self.reserve_quota(list_texts)
+                    async with self.concurrency.slot():
+                        is_sent = True
+                        response = await self.check_list(list_texts, estimated_tokens)
+                except asyncio.CancelledError:
+                    if not is_sent:
+                        self.release_quota(estimated_tokens)
+                    self.circuit_breaker.cancel_call()
+                    raise
+                except Exception as error:
+                    if is_outage_error(error):
+                        self.circuit_breaker.record_failure()
+                    else:
+                        self.circuit_breaker.record_success()
+                    if not is_retryable_error(error) or attempt == self.retry_policy.max_retries:
+                        raise
+                    await asyncio.sleep(self.retry_policy.get_delay(attempt, get_retry_after(error)))
+                else:
+                    self.circuit_breaker.record_success()
+                    return response
+
+        async def limited_check(batch_positions):
+            #~ Only the items the model dropped or garbled are sent again, as a smaller batch
+            batch_responses = {}
+            pending_positions = batch_positions
+            retries = 0
+            while True:
+                response = await resilient_check(item_texts[pending_positions])
+                failed_positions = []
+                for position, item in zip(pending_positions, self.align_response(response, item_texts[pending_positions])):
+                    if item is None:
+                        failed_positions.append(position)
+                    else:
+                        batch_responses[position] = item
+                if not failed_positions or retries == self.max_alignment_retries:
+                    return batch_responses, failed_positions, retries
+                retries += 1
+                pending_positions = failed_positions
+
+        #-- Bounded pipeline: a producer streams batches to a fixed pool of workers
+        batches_total = self.batcher.count_batches(miss_positions, item_texts, max_batch_items=batch_size)
+        self.writer.LOG_INFO(f"Batching: {len(miss_positions)} texts -> {batches_total} batches")
+
+        if cached_corrections:
+            yield expand_corrections(resolve_items(cached_corrections), batches_done=0)
+
+        batch_queue = asyncio.Queue(maxsize=self.pipeline_queue_size)
+        result_queue = asyncio.Queue(maxsize=self.pipeline_queue_size)
+        worker_count = min(self.pipeline_workers, batches_total)
+
+        async def produce():
+            for batch_positions in self.batcher.iter_batches(miss_positions, item_texts, max_batch_items=batch_size):
+                await batch_queue.put(batch_positions)
+            for _ in range(worker_count):
+                await batch_queue.put(None)
+
+        async def work():
+            while True:
+                batch_positions = await batch_queue.get()
+                if batch_positions is None:
+                    return
+                try:
+                    await result_queue.put((await limited_check(batch_positions), None))
+                except Exception as error:
+                    await result_queue.put((None, error))
+
+        tasks = [asyncio.ensure_future(produce())] + [asyncio.ensure_future(work()) for _ in range(worker_count)]
+        failed_batches = 0
+        last_error = None
+        try:
+            for batches_done in range(1, batches_total + 1):
+                batch_result, error = await result_queue.get()
+                if error is not None:
+                    #~ One failed batch never discards the others, its cells stay unchecked
+                    failed_batches += 1
+                    last_error = error
+                    if not isinstance(error, CircuitOpenError):
+                        self.writer.LOG_ERROR(f"Batch {batches_done}/{batches_total} failed: {str(error)}")
+                    yield expand_corrections({}, batches_done=batches_done)
+                    continue
+
+                batch_responses, failed_positions, retries = batch_result
+                if retries:
+                    self.writer.LOG_INFO(f"Batch {batches_done}/{batches_total}: {retries} partial retries")
+                if failed_positions:
+                    #~ Left unchecked (no fingerprint, no cache entry), they are picked up by the next run
+                    self.writer.LOG_WARNING(
+                        f"Batch {batches_done}/{batches_total}: {len(failed_positions)} items without a valid answer after {retries} retries"
+                    )
+
+                corrections = {}
+                for position, response in batch_responses.items():
+                    corrections[position] = {
+                        "status": bool(response["status"]),
+                        "fixed_text": None if response["status"] else response["fixed_text"]
+                    }
+                if self.correction_cache is not None:
+                    # Stored without padding, keys ignore it and every hit gets the padding of its own cell
+                    self.correction_cache.set_many({
+                        cache_keys[position]: {
+                            "status": correction["status"],
+                            "fixed_text": None if correction["status"] else str(correction["fixed_text"]).strip()
+                        }
+                        for position, correction in corrections.items()
+                    })
+
+                yield expand_corrections(resolve_items(corrections), batches_done=batches_done, retries=retries)
+
+            if failed_batches:
+                raise IncompleteCheckError(failed_batches, batches_total, last_error)
+        finally:
+            #~ Closing the generator early (client gone, job cancelled) stops the producer and the workers
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+
+    async def corrected_sheet(self, rows, batch_size=None):
+        """
+        Check a sheet and collect its corrections, the sheet itself is never copied
+
+        Returns:
+            List[Tuple[int, int, Any, Any]]: (x, y, old_value, new_value) of every corrected cell
+        """
+        cells = (
+            (None, (x, y), value)
+            for x, row in enumerate(rows)
+            for y, value in enumerate(row)
+            if value is not None
+        )
+        corrections = []
+        async for chunk in self.iter_cell_corrections(cells, batch_size=batch_size):
+            corrections.extend(
+                (*correction["coordinates"], correction["old_value"], correction["new_value"])
+                for correction in chunk["corrections"]
+            )
+        return corrections
+
+
+    def split_oversized_texts(self, texts):
+        """
+        Replace every text longer than the chunk size by its line / sentence chunks
+
+        Whitespace around a chunk is kept aside and never sent, so the corrected chunks are
+        joined back exactly, line breaks included.
+
+        Args:
+            texts (np.ndarray): Unique texts
+
+        Returns:
+            Tuple[np.ndarray, List[int], Dict[int, List[Tuple[str, int, str]]]]:
+                texts to send, position in `texts` of each of them, and for each split text its
+                (leading whitespace, item position, trailing whitespace) layout
+        """
+        item_texts = []
+        item_owners = []
+        chunk_layouts = {}
+        for position, text in enumerate(texts):
+            if self.text_splitter is None or not isinstance(text, str) or len(text) <= self.text_splitter.chunk_size or not text.strip():
+                item_texts.append(text)
+                item_owners.append(position)
+                continue
+
+            layout = []
+            pending_whitespace = ""
+            for chunk in self.text_splitter.split_text_exact(text):
+                core = chunk.strip()
+                if not core:
+                    pending_whitespace += chunk
+                    continue
+                leading = pending_whitespace + chunk[:len(chunk) - len(chunk.lstrip())]
+                trailing = chunk[len(chunk.rstrip()):]
+                pending_whitespace = ""
+                layout.append((leading, len(item_texts), trailing))
+                item_texts.append(core)
+                item_owners.append(position)
+            if pending_whitespace:
+                leading, item_position, trailing = layout[-1]
+                layout[-1] = (leading, item_position, trailing + pending_whitespace)
+            chunk_layouts[position] = layout
+
+        item_texts_array = np.empty(len(item_texts), dtype=object)
+        item_texts_array[:] = item_texts
+        return item_texts_array, item_owners, chunk_layouts
+
+
+    def join_chunk_corrections(self, layout, item_texts, item_results):
+        """Rebuild the correction of a split text from the corrections of its chunks"""
+        status = all(item_results[item_position]["status"] for _, item_position, _ in layout)
+        if status:
+            return {"status": True, "fixed_text": None}
+
+        parts = []
+        for leading, item_position, trailing in layout:
+            correction = item_results[item_position]
+            chunk_text = item_texts[item_position] if correction["status"] else str(correction["fixed_text"]).strip()
+            parts.append(leading + chunk_text + trailing)
+        return {"status": False, "fixed_text": "".join(parts)}
+
+
+    def deduplicate_texts(self, texts, positions=None):
+        """
+        Collapse identical (normalized) texts into one item
+
+        Args:
+            texts (List): Cell values, or texts already grouped exactly
+            positions (List[Iterable[int]], optional): Cell positions holding each text, `texts` are cells when None
+
+        Returns:
+            Tuple[np.ndarray, List[List[int]]]: Unique texts and, for each of them, the cell positions sharing it
+        """
+        unique_lookup = {}
+        unique_texts = []
+        unique_groups = []
+        for position, text in enumerate(texts):
+            normalized = normalize_text(text)
+            unique_idx = unique_lookup.get(normalized)
+            if unique_idx is None:
+                unique_idx = len(unique_texts)
+                unique_lookup[normalized] = unique_idx
+                unique_texts.append(text)
+                unique_groups.append([])
+            if positions is None:
+                unique_groups[unique_idx].append(position)
+            else:
+                unique_groups[unique_idx].extend(positions[position])
+
+        unique_texts_array = np.empty(len(unique_texts), dtype=object)
+        unique_texts_array[:] = unique_texts
+        return unique_texts_array, unique_groups
+
+
+
+    async def check_all_sheet(self, text_cells, sheet_names):
+        """
+        Args:
+            text_cells (Iterable[Tuple[str, List[Tuple[str, Tuple[int, int]]]]]): every text and the (sheet_name, (x, y)) of its cells
+            sheet_names (List[str]): Sheets covered by `text_cells`
+
+        Returns:
+            Dict[str, List[Tuple[int, int, Any, Any]]]: Mapping sheet name -> (x, y, old_value, new_value) of its corrected cells
+        """
+        sheet_corrections = {sheet_name: [] for sheet_name in sheet_names}
+        async for chunk in self.iter_text_corrections(text_cells):
+            for correction in chunk["corrections"]:
+                sheet_corrections[correction["sheet_name"]].append(
+                    (*correction["coordinates"], correction["old_value"], correction["new_value"])
+                )
+        return sheet_corrections
+
+
+    def run_all_sheet(self, excel_path: str, workbook_cache=None):
+        """
+        Check every sheet of a workbook, its text cells read with the sharedStrings scanner
+
+        Args:
+            excel_path (str): .xlsx path
+            workbook_cache (WorkbookCache, optional): Cache shared with the routes, the file is scanned directly when None
+        """
         if not excel_path.endswith(".xlsx"):
             raise ValueError("Invalid files")
-        wb = openpyxl.load_workbook(filename=excel_path)
-        sheet_names = wb.sheetnames
+        if workbook_cache is None:
+            workbook_cache = WorkbookCache(enable=False)
 
-        all_new_sheets = asyncio.run(self.check_all_sheet(wb))
-        return all_new_sheets
+        all_sheet_corrections = self.event_loop.run(self.check_all_sheet(
+            workbook_cache.iter_text_cells(excel_path),
+            workbook_cache.get_sheet_names(excel_path)
+        ))
+        return all_sheet_corrections
 
 
     def run_sheet(self, sheet_rows: List):
-        new_sheet_rows = asyncio.run(self.corrected_sheet(sheet_rows))
-        return new_sheet_rows
+        sheet_corrections = self.event_loop.run(self.corrected_sheet(sheet_rows))
+        return sheet_corrections
+
+
+    def stream_text_cells(self, text_cells, batch_size=None):
+        """Synchronous, cancellable stream over `iter_text_corrections` (a `LoopStream`)"""
+        return self.iterate_chunks(self.iter_text_corrections(text_cells, batch_size=batch_size))
+
+
+    def iterate_chunks(self, chunks):
+        return self.event_loop.iterate(chunks)
+
+
+    def close(self):
+        """Close the shared HTTP client and stop the event loop, later calls do nothing"""
+        if not self.event_loop.loop.is_running():
+            return
+        self.event_loop.run(self.http_async_client.aclose(), timeout=5)
+        self.event_loop.stop()
 
 
     #-- Interact with cell and sheet
     def find_all_common_substring(self, string_a, string_b):
-        list_a = string_a.split(" ")
-        list_b = string_b.split(" ")
-        n, m = len(list_a), len(list_b)
-
-        #~ DP Matrix
-        matrix = np.zeros((n+1, m+1), dtype=int)
-        for i in range(n):
-            for j in range(m):
-                if list_a[i] == list_b[j]:
-                    matrix[i+1, j+1] = matrix[i, j] + 1
-
-        #~ Collect substrings with indices
-        candidates = []
-        for i in range(1, n+1):
-            for j in range(1, m+1):
-                length = matrix[i, j]
-                if length > 0:
-                    substring = " ".join(list_a[i-length:i])
-                    start_a = i - length
-                    start_b = j - length
-                    candidates.append((substring, start_a, i, start_b, j))  
-
-        #~ Keep only maximal ones
-        maximal = []
-        for s, sa, ea, sb, eb in candidates:
-            if not any((s != t and s in t) for t, *_ in candidates):
-                maximal.append((s, sa, ea, sb, eb))
-
-        #~ Deduplicate
-        seen = set()
-        result = []
-        for item in maximal:
-            if item[0] not in seen:
-                result.append(item)
-                seen.add(item[0])
-        return result
+        return find_common_runs(string_a, string_b)
 
     
     def get_common_missing_idx(self, string_a, string_b):
-        result = self.find_all_common_substring(string_a=string_a, string_b=string_b)
-        #-- Get missing idx
-        len_a = len(string_a.split(" "))
-        len_b = len(string_b.split(" "))
-        string_a_idx_mask = np.zeros(len_a, dtype=bool)
-        string_b_idx_mask = np.zeros(len_b, dtype=bool)
-
-        for _, sa, ea, sb, eb in result:
-            string_a_idx_mask[sa:ea] = True
-            string_b_idx_mask[sb:eb] = True
-
-        common_a = np.flatnonzero(string_a_idx_mask)
-        common_b = np.flatnonzero(string_b_idx_mask)
-        missing_a = np.flatnonzero(~string_a_idx_mask)
-        missing_b = np.flatnonzero(~string_b_idx_mask)
-
-        return common_a, common_b, missing_a, missing_b, result
-
-
-    def get_character_styles(self, sheet, cell_address):
-        cell = sheet.range(cell_address)
-        text = cell.value
-        if not text:
-            return styles
-        
-        #~ We'll group characters by their formatting runs:
-        styles = []
-        length = len(text)
-        words = text.split(" ")
-        word_info = {}
-        i = 0
-        for word_idx, word in enumerate(words):
-            len_word = len(word)
-            list_char_idx = list(range(i, i + len_word + 1))
-            i += len_word + 1
-            word_info[word_idx] = {
-                "list_char_idx": list_char_idx,
-                "styles": None,
-            }
+        return get_common_missing_idx(string_a, string_b)
 
-        for word_idx, word_item_info in word_info.items():
-            start_idx = min(word_info[word_idx]["list_char_idx"] )
-            first_char_font = cell.characters[start_idx].font
-            word_info[word_idx]["styles"] = {
-                "bold": first_char_font.bold,
-                "italic": first_char_font.italic,
-                "color": first_char_font.color,
-                "size": first_char_font.size,
-                "name": first_char_font.name,
-            }
-        return word_info
-
-
-    # def set_styles(self, modify_sheet, cell_address, root_word_info, common_root, common_modify):
-    #     modify_word_info = self.get_character_styles(modify_sheet, cell_address)
-    #     modify_cell = modify_sheet.range(cell_address)
-    #     for root_idx, modify_idx in tqdm(zip(common_root, common_modify)):
-    #         word_at_root_idx_info = root_word_info[root_idx]
-    #         word_at_modify_idx_info = modify_word_info[modify_idx]
-
-    #         modify_styles = word_at_root_idx_info["styles"]
-    #         modify_list_char_idx = word_at_modify_idx_info["list_char_idx"] 
-    #         for modify_char_idx in modify_list_char_idx:
-    #             modify_cell_font = modify_cell.characters[modify_char_idx].font
-    #             for attr, value in modify_styles.items():
-    #                 setattr(modify_cell_font, attr, value)
-
-    def set_styles(self, modify_sheet, cell_address, common_root, common_modify, new_value):
-        root_word_info = self.get_character_styles(modify_sheet, cell_address)
-        modify_cell = modify_sheet.range(cell_address)
-        modify_cell.value = new_value
-
-        modify_word_info = self.get_character_styles(modify_sheet, cell_address)
-        for root_idx, modify_idx in tqdm(zip(common_root, common_modify)):
-            word_at_root_idx_info = root_word_info[root_idx]
-            word_at_modify_idx_info = modify_word_info[modify_idx]
-
-            modify_styles = word_at_root_idx_info["styles"]
-            modify_list_char_idx = word_at_modify_idx_info["list_char_idx"] 
-            for modify_char_idx in modify_list_char_idx:
-                modify_cell_font = modify_cell.characters[modify_char_idx].font
-                for attr, value in modify_styles.items():
-                    setattr(modify_cell_font, attr, value)
-
-
-    def change_sheet_cell(self, sheet, cell_address, old_value, new_value):
+
+    def open_cell_writer(self, local_path: str, backend: str = None):
+        """Open `local_path` for writing corrections with the configured backend (xlwings or openpyxl)"""
+        return CELL_WRITERS[backend or self.cell_writer_backend](local_path, style_transfer=self.style_transfer)
+
+
+    def set_styles(self, cell_writer, sheet_name, cell_address, common_root, common_modify, new_value):
+        counts = cell_writer.set_value(
+            sheet_name=sheet_name,
+            cell_address=cell_address,
+            new_value=new_value,
+            common_root=common_root,
+            common_modify=common_modify
+        )
+        excel_calls = ""
+        if "excel_calls" in counts:
+            excel_calls = f", {counts['excel_calls']} Excel calls (per-character transfer: {counts['per_character_calls']})"
+        self.writer.LOG_INFO(f"Styles of {sheet_name}!{cell_address}: {counts['runs']} runs{excel_calls}")
+
+
+    def change_sheet_cell(self, cell_writer, sheet_name, cell_address, old_value, new_value):
         common_old, common_new, missing_old, missing_new, result = self.get_common_missing_idx(old_value, new_value)
         self.set_styles(
-            modify_sheet=sheet,
+            cell_writer=cell_writer,
+            sheet_name=sheet_name,
             cell_address=cell_address,
             common_root=common_old,
             common_modify=common_new,
             new_value=new_value
         )
 
+
+    def iter_apply_corrections(self, cell_writer, corrections: List[Dict], progress_every=25):
+        """
+        Apply many corrections inside one open workbook, the caller saves it once at the end
+
+        A cell already holding the corrected text is skipped, a cell edited since the check (neither
+        the old nor the new text) is reported as failed and left untouched.
+
+        Args:
+            cell_writer (XlwingsCellWriter | OpenpyxlCellWriter): Workbook opened by `open_cell_writer`
+            corrections (List[Dict]): {"sheet_name", "cell", "old_value", "new_value"} items
+            progress_every (int): Cells between two progress reports
+
+        Yields:
+            dict: {"done", "total", "applied", "skipped", "failed"}, the last report also has
+                "failures": [{"sheet_name", "cell", "error"}, ...]
+        """
+        report = {"done": 0, "total": len(corrections), "applied": 0, "skipped": 0, "failed": 0}
+        failures = []
+
+        for correction in corrections:
+            sheet_name = correction["sheet_name"]
+            cell_address = correction["cell"]
+            try:
+                current_value = cell_writer.get_value(sheet_name, cell_address)
+                if current_value == correction["new_value"]:
+                    report["skipped"] += 1
+                elif current_value != correction["old_value"]:
+                    raise ValueError("Cell was modified since the grammar check")
+                else:
+                    self.change_sheet_cell(
+                        cell_writer=cell_writer,
+                        sheet_name=sheet_name,
+                        cell_address=cell_address,
+                        old_value=correction["old_value"],
+                        new_value=correction["new_value"]
+                    )
+                    report["applied"] += 1
+            except Exception as e:
+                self.writer.LOG_WARNING(f"Cannot apply correction of {sheet_name}!{cell_address}: {str(e)}")
+                report["failed"] += 1
+                failures.append({"sheet_name": sheet_name, "cell": cell_address, "error": str(e)})
+
+            report["done"] += 1
+            if report["done"] % progress_every == 0 and report["done"] < report["total"]:
+                yield dict(report)
+
+        self.writer.LOG_INFO(
+            f"Applied {report['applied']} of {report['total']} corrections "
+            f"({report['skipped']} already applied, {report['failed']} failed)"
+        )
+        yield {**report, "failures": failures}
+
+
     #-- PREPROCESSING
     def sanitize_json(self, raw_output: str):
         if isinstance(raw_output, dict):
             return json.dumps(raw_output, ensure_ascii=False)
-
-        raw = str(raw_output).strip()
-        raw = re.sub(r"^```(?:json)?", "", raw)
-        raw = re.sub(r"```$", "", raw)
-        raw = raw.strip()
-        raw = re.sub(r'^[^{\[]*', '', raw)
-        raw = re.sub(r'[^}\]]*$', '', raw)
-
-        try:
-            parsed = json.loads(raw)
-            compact = json.dumps(parsed, ensure_ascii=False, indent=2)
-            return compact
-        except Exception:
-            return raw
-
-
-
-
+        return self.json_repairer.repair(raw_output)[0]
@@ -0,0 +1,91 @@
+from typing import Iterable, Iterator, List
+
+
+def estimate_tokens(text, chars_per_token: float = 4.0) -> int:
+    """
+    Tokenizer-free token estimate, roughly 4 characters per token for English text
+
+    Args:
+        text: Any cell value, converted with str()
+        chars_per_token (float): Average number of characters per token
+
+    Returns:
+        int: Estimated number of tokens
+    """
+    return int(len(str(text)) / chars_per_token) + 1
+
+
+class TokenBudgetBatcher:
+    def __init__(
+        self,
+        max_batch_tokens: int = 6000,
+        max_batch_items: int = 15,
+        prompt_tokens: int = 0,
+        output_ratio: float = 2.0,
+        item_overhead_tokens: int = 12,
+        chars_per_token: float = 4.0
+    ):
+        """
+        Pack texts into LLM batches by estimated input + output token count
+
+        Args:
+            max_batch_tokens (int): Token budget of one request (prompt + items + expected answer)
+            max_batch_items (int): Hard cap on the number of items in one request
+            prompt_tokens (int): Fixed cost of the prompt template, charged once per batch
+            output_ratio (float): Expected output tokens per input token of an item
+            item_overhead_tokens (int): JSON keys and ids added around every item, input and output
+            chars_per_token (float): Ratio used by `estimate_tokens`
+        """
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_items = max_batch_items
+        self.prompt_tokens = prompt_tokens
+        self.output_ratio = output_ratio
+        self.item_overhead_tokens = item_overhead_tokens
+        self.chars_per_token = chars_per_token
+
+
+    def estimate_item_tokens(self, text) -> int:
+        text_tokens = estimate_tokens(text, self.chars_per_token)
+        return int(text_tokens * (1 + self.output_ratio)) + 2 * self.item_overhead_tokens
+
+
+    def estimate_batch_tokens(self, texts) -> int:
+        return self.prompt_tokens + sum(self.estimate_item_tokens(text) for text in texts)
+
+
+    def iter_batches(self, positions: Iterable[int], texts, max_batch_items: int = None) -> Iterator[List[int]]:
+        """
+        Greedy in-order packing, an item larger than the whole budget gets a batch of its own.
+        Batches are produced one at a time, only the batch being filled is held in memory.
+
+        Args:
+            positions (Iterable[int]): Positions of the items to batch
+            texts: Indexable collection holding the text at every position
+            max_batch_items (int, optional): Overrides the configured item cap for this call
+
+        Yields:
+            List[int]: Positions of one batch
+        """
+        item_budget = self.max_batch_tokens - self.prompt_tokens
+        max_batch_items = max_batch_items or self.max_batch_items
+        batch_positions = []
+        batch_tokens = 0
+        for position in positions:
+            item_tokens = self.estimate_item_tokens(texts[position])
+            if batch_positions and (
+                batch_tokens + item_tokens > item_budget
+                or len(batch_positions) >= max_batch_items
+            ):
+                yield batch_positions
+                batch_positions = []
+                batch_tokens = 0
+            batch_positions.append(position)
+            batch_tokens += item_tokens
+
+        if batch_positions:
+            yield batch_positions
+
+
+    def count_batches(self, positions: List[int], texts, max_batch_items: int = None) -> int:
+        """Number of batches `iter_batches` will produce, without keeping them"""
+        return sum(1 for _ in self.iter_batches(positions, texts, max_batch_items=max_batch_items))
@@ -0,0 +1,133 @@
+from typing import List
+
+import xlwings as xw
+from openpyxl import load_workbook
+from openpyxl.cell.rich_text import CellRichText, TextBlock
+
+from projects.modules.style_transfer import StyleTransfer, get_word_spans, build_style_runs
+
+
+class XlwingsCellWriter:
+    def __init__(self, local_path: str, style_transfer: StyleTransfer):
+        """
+        Write corrections through a running Excel instance, character formatting is carried over by
+        `StyleTransfer`. Screen updating is off until the writer is closed.
+
+        Examples:
+            cell_writer = XlwingsCellWriter("report.xlsx", StyleTransfer())
+            cell_writer.set_value("Sheet1", "B2", "the cat sat", common_root=[1, 2], common_modify=[1, 2])
+            cell_writer.save()
+            cell_writer.close()
+        """
+        self.local_path = local_path
+        self.style_transfer = style_transfer
+        self.wb = xw.Book(local_path)
+        self.screen_updating = self.wb.app.screen_updating
+        self.wb.app.screen_updating = False
+
+
+    def get_value(self, sheet_name: str, cell_address: str):
+        return self.wb.sheets[sheet_name].range(cell_address).value
+
+
+    def set_value(self, sheet_name: str, cell_address: str, new_value: str, common_root, common_modify) -> dict:
+        return self.style_transfer.transfer(
+            cell=self.wb.sheets[sheet_name].range(cell_address),
+            new_value=new_value,
+            common_root=common_root,
+            common_modify=common_modify
+        )
+
+
+    def save(self):
+        self.wb.save()
+
+
+    def close(self):
+        self.wb.app.screen_updating = self.screen_updating
+        self.wb.close()
+
+
+class OpenpyxlCellWriter:
+    def __init__(self, local_path: str, style_transfer: StyleTransfer = None):
+        """
+        Write corrections straight into the .xlsx file, without Excel
+
+        Word styles are read from the cell rich text (font of the first character of every word) and
+        written back as `CellRichText` runs, one `TextBlock` per contiguous style run. Every cell of a
+        session is edited in memory and written by a single `save`. `style_transfer` is only taken for
+        a constructor shared with `XlwingsCellWriter`.
+
+        Examples:
+            cell_writer = OpenpyxlCellWriter("report.xlsx")
+            for correction in corrections:
+                cell_writer.set_value(...)
+            cell_writer.save()
+        """
+        self.local_path = local_path
+        self.wb = load_workbook(local_path, rich_text=True, keep_vba=local_path.lower().endswith(".xlsm"))
+
+
+    def get_value(self, sheet_name: str, cell_address: str):
+        value = self.wb[sheet_name][cell_address].value
+        if isinstance(value, CellRichText):
+            return str(value)
+        return value
+
+
+    def get_word_fonts(self, value, spans) -> List:
+        """InlineFont of the first character of every word, None where the text uses the cell font"""
+        blocks = list(value) if isinstance(value, CellRichText) else [str(value)]
+        word_fonts = []
+        block_idx = 0
+        block_end = len(blocks[0]) if isinstance(blocks[0], str) else len(blocks[0].text)
+        for start, _ in spans:
+            while block_end <= start and block_idx < len(blocks) - 1:
+                block_idx += 1
+                block = blocks[block_idx]
+                block_end += len(block) if isinstance(block, str) else len(block.text)
+            block = blocks[block_idx]
+            word_fonts.append(None if isinstance(block, str) else block.font)
+        return word_fonts
+
+
+    def set_value(self, sheet_name: str, cell_address: str, new_value: str, common_root, common_modify) -> dict:
+        cell = self.wb[sheet_name][cell_address]
+        old_value = cell.value
+        old_text = str(old_value) if old_value is not None else ""
+        if not old_text or not new_value:
+            cell.value = new_value
+            return {"runs": 0}
+
+        old_fonts = self.get_word_fonts(old_value, get_word_spans(old_text))
+        new_spans = get_word_spans(new_value)
+
+        #~ Like Excel, words without a match take the style of the first character
+        word_fonts = {word_idx: old_fonts[0] for word_idx in range(len(new_spans))}
+        for root_idx, modify_idx in zip(common_root, common_modify):
+            if int(root_idx) < len(old_fonts):
+                word_fonts[int(modify_idx)] = old_fonts[int(root_idx)]
+
+        runs = build_style_runs(new_spans, word_fonts)
+        if all(font is None for _, _, font in runs):
+            cell.value = new_value
+        else:
+            cell.value = CellRichText([
+                new_value[start:end] if font is None else TextBlock(font, new_value[start:end])
+                for start, end, font in runs
+            ])
+        return {"runs": len(runs)}
+
+
+    def save(self):
+        self.wb.save(self.local_path)
+
+
+    def close(self):
+        self.wb.close()
+
+
+CELL_WRITERS = {
+    "xlwings": XlwingsCellWriter,
+    "openpyxl": OpenpyxlCellWriter,
+}
@@ -0,0 +1,174 @@
+import time
+import asyncio
+from contextlib import asynccontextmanager
+
+import openai
+
+
+#-- ERROR CLASSIFICATION
+def is_throttle_error(error: Exception) -> bool:
+    """429 responses and timeouts mean the endpoint is saturated"""
+    if isinstance(error, (openai.RateLimitError, openai.APITimeoutError, asyncio.TimeoutError)):
+        return True
+    return getattr(error, "status_code", None) == 429
+
+
+def get_retry_after(error: Exception):
+    """
+    Read the Retry-After delay sent with a throttled response
+
+    Returns:
+        float | None: Delay in seconds, None if the response has no hint
+    """
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms is not None:
+        try:
+            return float(retry_after_ms) / 1000
+        except ValueError:
+            pass
+
+    retry_after = headers.get("retry-after")
+    if retry_after is not None:
+        try:
+            return float(retry_after)
+        except ValueError:
+            return None
+    return None
+
+
+class AIMDConcurrencyController:
+    def __init__(
+        self,
+        min_concurrency: int = 1,
+        max_concurrency: int = 16,
+        initial_concurrency: int = 4,
+        additive_increase: float = 1.0,
+        multiplicative_decrease: float = 0.5
+    ):
+        """
+        Additive-increase / multiplicative-decrease limit on in-flight LLM requests
+
+        The window grows by `additive_increase` per window of successful requests and is
+        multiplied by `multiplicative_decrease` on a 429 or timeout. A throttled response
+        carrying Retry-After also pauses every new request until the delay has passed.
+
+        The controller belongs to the agent's background event loop: every check runs there, so
+        the state needs no lock. Waiting requests sleep on an `asyncio.Condition` and are woken
+        when a slot is released, or when a Retry-After pause ends. `get_state` can be called from
+        other threads and reads a snapshot without locking.
+
+        Args:
+            min_concurrency (int): Lower bound of the window
+            max_concurrency (int): Upper bound of the window
+            initial_concurrency (int): Window before any feedback
+            additive_increase (float): Requests added per window of successes
+            multiplicative_decrease (float): Factor applied to the window on throttling
+        """
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.additive_increase = additive_increase
+        self.multiplicative_decrease = multiplicative_decrease
+
+        self.window = float(min(max(initial_concurrency, min_concurrency), max_concurrency))
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self.last_decrease = 0.0
+        self.total_success = 0
+        self.total_throttled = 0
+        #~ Bound to the running loop on first use
+        self.condition = asyncio.Condition()
+
+
+    #-- STATE
+    @property
+    def limit(self) -> int:
+        return max(self.min_concurrency, int(self.window))
+
+
+    def get_state(self) -> dict:
+        return {
+            "window": round(self.window, 2),
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "blocked_for": round(max(0.0, self.blocked_until - time.monotonic()), 2),
+            "total_success": self.total_success,
+            "total_throttled": self.total_throttled,
+        }
+
+
+    #-- FEEDBACK
+    def record_success(self):
+        self.total_success += 1
+        self.window = min(
+            float(self.max_concurrency),
+            self.window + self.additive_increase / self.window
+        )
+
+
+    def record_throttle(self, started_at: float, retry_after=None):
+        self.total_throttled += 1
+        now = time.monotonic()
+        if retry_after:
+            self.blocked_until = max(self.blocked_until, now + retry_after)
+
+        # Requests sent before the last decrease saw the old window, count one decrease per congestion event
+        if started_at >= self.last_decrease:
+            self.window = max(
+                float(self.min_concurrency),
+                self.window * self.multiplicative_decrease
+            )
+            self.last_decrease = now
+
+
+    #-- SLOTS
+    async def acquire(self):
+        async with self.condition:
+            while True:
+                now = time.monotonic()
+                wait_time = self.blocked_until - now
+                if wait_time <= 0 and self.in_flight < self.limit:
+                    self.in_flight += 1
+                    return now
+                #~ Paused by Retry-After: wake up when the pause ends, otherwise when a slot is released
+                try:
+                    await asyncio.wait_for(self.condition.wait(), timeout=wait_time if wait_time > 0 else None)
+                except asyncio.TimeoutError:
+                    pass
+
+
+    async def release(self):
+        self.in_flight -= 1
+        # Shielded: a cancelled request must still wake a waiter, the window may also have grown
+        await asyncio.shield(self.notify_waiters())
+
+
+    async def notify_waiters(self):
+        async with self.condition:
+            self.condition.notify(max(1, self.limit - self.in_flight))
+
+
+    @asynccontextmanager
+    async def slot(self):
+        """
+        Hold one in-flight request, the outcome of the wrapped call is fed back to the window
+
+        Examples:
+            async with controller.slot():
+                response = await chain.ainvoke(...)
+        """
+        started_at = await self.acquire()
+        try:
+            yield
+        except Exception as error:
+            if is_throttle_error(error):
+                self.record_throttle(started_at, get_retry_after(error))
+            raise
+        else:
+            self.record_success()
+        finally:
+            await self.release()
@@ -0,0 +1,138 @@
+import asyncio
+import threading
+from concurrent.futures import Future, CancelledError
+
+
+class BackgroundEventLoop:
+    def __init__(self, name: str = "agent-event-loop"):
+        """
+        One event loop running forever in a daemon thread
+
+        Synchronous callers (Flask handlers, job workers) hand coroutines over with
+        `run_coroutine_threadsafe`, so every LLM call of the process shares the same loop,
+        the same HTTP connection pool and the same loop-bound primitives.
+
+        Examples:
+            event_loop = BackgroundEventLoop()
+            sheet_corrections = event_loop.run(agent.corrected_sheet(rows))
+            for chunk in event_loop.iterate(agent.iter_text_corrections(text_cells)):
+                ...
+        """
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.run_forever, name=name, daemon=True)
+        self.thread.start()
+
+
+    def run_forever(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+
+    #-- SUBMIT
+    def submit(self, coroutine) -> Future:
+        if threading.current_thread() is self.thread:
+            raise RuntimeError("Blocking on the background loop from its own thread would deadlock, await the coroutine instead")
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+
+    def run(self, coroutine, timeout=None):
+        """Run `coroutine` on the loop and block the calling thread until it returns"""
+        future = self.submit(coroutine)
+        try:
+            return future.result(timeout=timeout)
+        except BaseException:
+            # Interrupted or timed out: do not leave the coroutine running on the loop
+            future.cancel()
+            raise
+
+
+    def iterate(self, async_generator) -> "LoopStream":
+        """Consume an async generator from a synchronous thread, see `LoopStream`"""
+        return LoopStream(self, async_generator)
+
+
+    #-- SHUTDOWN
+    def stop(self):
+        if self.loop.is_running():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=5)
+
+
+class LoopStream:
+    def __init__(self, event_loop: BackgroundEventLoop, async_generator):
+        """
+        Synchronous iterator over an async generator running on a `BackgroundEventLoop`
+
+        `cancel` can be called from any thread: the step in progress is cancelled on the loop (the
+        generator's `finally` runs there) and the consumer gets a `CancelledError` right away,
+        instead of after the slow batch, retry backoff or circuit breaker wait it was blocked on.
+        The consumer calls `close` once done.
+
+        Examples:
+            stream = event_loop.iterate(agent.iter_text_corrections(text_cells))
+            try:
+                for chunk in stream:
+                    ...
+            finally:
+                stream.close()
+
+            stream.cancel()  # from another thread
+        """
+        self.event_loop = event_loop
+        self.async_generator = async_generator
+        self.future = None
+        self.task = None
+        self.cancelled = False
+        self.closed = False
+        self.lock = threading.Lock()
+
+
+    def __iter__(self):
+        return self
+
+
+    def __next__(self):
+        with self.lock:
+            if self.cancelled:
+                raise CancelledError("Stream cancelled")
+            if self.closed:
+                raise StopIteration
+            self.future = future = self.event_loop.submit(self.step())
+        try:
+            return future.result()
+        except StopAsyncIteration:
+            raise StopIteration
+        except BaseException:
+            # Interrupted: do not leave the step running on the loop
+            future.cancel()
+            raise
+        finally:
+            with self.lock:
+                self.future = None
+
+
+    async def step(self):
+        self.task = asyncio.current_task()
+        return await self.async_generator.__anext__()
+
+
+    async def finalize(self):
+        # A cancelled step may still be unwinding, the generator cannot be closed before it is done
+        if self.task is not None and not self.task.done():
+            await asyncio.wait([self.task])
+        await self.async_generator.aclose()
+
+
+    def cancel(self):
+        with self.lock:
+            self.cancelled = True
+            if self.future is not None:
+                self.future.cancel()
+
+
+    def close(self):
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+        self.event_loop.run(self.finalize())
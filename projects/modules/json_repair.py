@@ -0,0 +1,173 @@
+import re
+import json
+import threading
+from typing import List, Tuple
+
+
+CODE_FENCE_PATTERN = re.compile(r"```(?:json|JSON)?\s*(.*?)(?:```|$)", re.DOTALL)
+STRING_ESCAPES = {"\n": "\\n", "\r": "\\r", "\t": "\\t"}
+CLOSERS = {"{": "}", "[": "]"}
+
+
+class LocalJsonRepairer:
+    REPAIR_PATHS = (
+        "clean",
+        "code_fence",
+        "outer_braces",
+        "trailing_comma",
+        "unescaped_newline",
+        "truncated_array",
+        "failed",
+    )
+
+    def __init__(self):
+        """
+        Deterministic repair of the JSON answered by the LLM, run before any LLM based fix-up
+
+        Repairs, in order:
+            - code_fence: ```json ... ``` wrappers
+            - outer_braces: text before the first and after the last bracket of the root value
+            - trailing_comma: `,` right before `}` or `]`
+            - unescaped_newline: raw line breaks and tabs inside strings
+            - truncated_array: answer cut off mid-array, complete items are kept and brackets closed
+
+        Every response counts once in "clean" (valid as is), "failed" (still invalid), or in
+        each repair path it needed.
+
+        Examples:
+            repairer = LocalJsonRepairer()
+            text, paths = repairer.repair('```json\n{"data": [{"text_id": 1},]}\n```')
+            # text == '{"data": [{"text_id": 1}]}', paths == ["code_fence", "trailing_comma"]
+        """
+        self.counts = {path: 0 for path in self.REPAIR_PATHS}
+        self.lock = threading.Lock()
+
+
+    #-- REPAIR
+    def repair(self, text) -> Tuple[str, List[str]]:
+        """
+        Returns:
+            Tuple[str, List[str]]: Repaired JSON text (the input if it cannot be repaired), repair paths that fired
+        """
+        raw = str(text).strip()
+        if self.is_valid(raw):
+            self.record(["clean"])
+            return raw, ["clean"]
+
+        paths = []
+        fenced = CODE_FENCE_PATTERN.search(raw)
+        if fenced:
+            raw = fenced.group(1).strip()
+            paths.append("code_fence")
+
+        starts = [index for index in (raw.find("{"), raw.find("[")) if index >= 0]
+        if not starts:
+            self.record(["failed"])
+            return str(text), ["failed"]
+        if min(starts) > 0:
+            raw = raw[min(starts):]
+            paths.append("outer_braces")
+
+        repaired, scan_paths, open_brackets, last_item = self.scan(raw)
+        paths.extend(path for path in scan_paths if path not in paths)
+
+        if open_brackets and last_item is not None:
+            #~ Cut after the last complete array item and close what is still open
+            cut_index, item_brackets = last_item
+            repaired = repaired[:cut_index] + "".join(CLOSERS[bracket] for bracket in reversed(item_brackets))
+            paths.append("truncated_array")
+
+        if self.is_valid(repaired):
+            self.record(paths)
+            return repaired, paths
+
+        self.record(["failed"])
+        return str(text), ["failed"]
+
+
+    def scan(self, text: str):
+        """
+        One pass over the text, aware of strings: escapes raw line breaks inside strings, drops trailing
+        commas, stops after the root value and remembers where the last complete array item ends
+
+        Returns:
+            Tuple[str, List[str], List[str], Tuple[int, List[str]] | None]:
+                repaired text, repair paths, brackets left open, (end offset, open brackets) of the last complete array item
+        """
+        output = []
+        paths = []
+        open_brackets = []
+        last_item = None
+        in_string = False
+        is_escaped = False
+
+        for index, char in enumerate(text):
+            if in_string:
+                if is_escaped:
+                    is_escaped = False
+                elif char == "\\":
+                    is_escaped = True
+                elif char == '"':
+                    in_string = False
+                elif char in STRING_ESCAPES:
+                    char = STRING_ESCAPES[char]
+                    if "unescaped_newline" not in paths:
+                        paths.append("unescaped_newline")
+                output.append(char)
+                continue
+
+            if char == '"':
+                in_string = True
+            elif char in CLOSERS:
+                open_brackets.append(char)
+            elif char in "}]":
+                position = len(output) - 1
+                while position >= 0 and output[position].isspace():
+                    position -= 1
+                if position >= 0 and output[position] == ",":
+                    del output[position]
+                    if "trailing_comma" not in paths:
+                        paths.append("trailing_comma")
+
+                if open_brackets:
+                    open_brackets.pop()
+                output.append(char)
+                if not open_brackets:
+                    # Root value closed, anything after it is chatter
+                    if text[index + 1:].strip() and "outer_braces" not in paths:
+                        paths.append("outer_braces")
+                    break
+                if open_brackets[-1] == "[":
+                    last_item = (len(output), list(open_brackets))
+                continue
+            output.append(char)
+
+        if last_item is not None:
+            last_item = (len("".join(output[:last_item[0]])), last_item[1])
+        return "".join(output), paths, open_brackets, last_item
+
+
+    def repair_message(self, message) -> str:
+        """Chain step: takes the LLM message (or its text) and hands repaired JSON text to the parser"""
+        return self.repair(getattr(message, "content", message))[0]
+
+
+    @staticmethod
+    def is_valid(text: str) -> bool:
+        try:
+            json.loads(text)
+            return True
+        except ValueError:
+            return False
+
+
+    #-- COUNTERS
+    def record(self, paths):
+        with self.lock:
+            for path in paths:
+                self.counts[path] += 1
+
+
+    def get_counts(self) -> dict:
+        with self.lock:
+            return dict(self.counts)
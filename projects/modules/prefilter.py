@@ -0,0 +1,117 @@
+import datetime
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+
+#~ Units accepted after a number, with an optional SI prefix on the base units: any other word
+#~ after a number ("3 cats", "2 days") is prose and is checked
+UNIT_PATTERN = (
+    r"%|‰|°[CF]?|[pnuµmkMGT]?(?:m|g|s|Hz|V|A|W|Wh|Ω|F|J|N|Pa|B|bit|bps)"
+    r"|min|h|K|Nm|bar|mbar|psi|rpm|dB[mV]?|px|pt|[lL]|m[lL]|m/s|km/h|[cm]?m[²³]"
+)
+
+#~ Every pattern must match the whole stripped cell text
+DEFAULT_PATTERNS = {
+    # 1.2, v2.0.1, 3.1.0-rc1
+    "version": r"[vV]?\d+(?:\.\d+)+(?:[-+][0-9A-Za-z.]+)?",
+    # 42, -3.5, 1,000, 12 mm, 3.3V, 50 %, 10 kHz. Not "3 cats", "2 days late", "5 items"
+    "number_unit": rf"[-+±~]?\d[\d,.]*\s*(?:{UNIT_PATTERN})?",
+    # One token holding an underscore or a digit: FSM_FaultState_01, ABC-1234, 0x1F, R12/C3
+    "identifier": r"(?=[\w.:/#\-]*[_\d])[\w.:/#\-]+",
+    # One upper case token: TBD, N/A, CAN-FD
+    "uppercase_code": r"[A-Z][A-Z0-9.:/#&\-]*",
+}
+
+DEFAULT_RULES = ["non_text", "version", "number_unit", "identifier", "uppercase_code", "letter_ratio"]
+
+
+class ProsePrefilter:
+    def __init__(
+        self,
+        rules: List[str] = None,
+        patterns: Dict[str, str] = None,
+        min_letters: int = 2,
+        min_letter_ratio: float = 0.5
+    ):
+        """
+        Drop cells with no checkable natural language before they are batched to the LLM
+
+        Rules are applied in order and a cell is attributed to the first rule it matches:
+            - non_text: ints, floats, bools, dates and times
+            - <pattern name>: the stripped text fully matches the regex. number_unit only accepts
+              the units of UNIT_PATTERN, so short prose such as "3 cats" or "2 days late" is kept
+            - letter_ratio: fewer than `min_letters` letters, or letters / non-space characters below `min_letter_ratio`
+
+        Args:
+            rules (List[str]): Enabled rules, in evaluation order
+            patterns (Dict[str, str]): Extra or overriding regex rules, merged into DEFAULT_PATTERNS
+            min_letters (int): Minimum number of letters of a prose cell
+            min_letter_ratio (float): Minimum share of letters among non-space characters
+
+        Examples:
+            prefilter = ProsePrefilter()
+            keep_mask, skip_counts = prefilter.filter(["teh cat", 42, "FSM_FaultState_01"])
+            # keep_mask == [True, False, False], skip_counts == {"non_text": 1, "identifier": 1}
+        """
+        self.rules = list(rules) if rules is not None else list(DEFAULT_RULES)
+        self.patterns = {**DEFAULT_PATTERNS, **(patterns or {})}
+        self.min_letters = min_letters
+        self.min_letter_ratio = min_letter_ratio
+
+        unknown_rules = [
+            rule for rule in self.rules
+            if rule not in ("non_text", "letter_ratio") and not self.patterns.get(rule)
+        ]
+        if unknown_rules:
+            raise ValueError(f"Unknown pre-filter rules: {unknown_rules}")
+
+
+    def classify(self, values) -> np.ndarray:
+        """
+        Returns:
+            np.ndarray: Name of the rule skipping each value, None for prose cells to check
+        """
+        values = pd.Series(list(values), dtype=object)
+        skip_rules = np.full(len(values), None, dtype=object)
+        if not len(values):
+            return skip_rules
+
+        is_text = values.map(lambda value: isinstance(value, str)).to_numpy(dtype=bool)
+        texts = values.where(is_text, "").astype(str).str.strip()
+
+        for rule in self.rules:
+            pending = skip_rules == None  # noqa: E711
+            if not pending.any():
+                break
+
+            if rule == "non_text":
+                is_skipped = ~is_text & values.map(
+                    lambda value: isinstance(value, (int, float, datetime.date, datetime.time))
+                ).to_numpy(dtype=bool)
+            elif rule == "letter_ratio":
+                letters = texts.str.count(r"[^\W\d_]").to_numpy()
+                non_spaces = (texts.str.len() - texts.str.count(r"\s")).to_numpy()
+                letter_ratio = np.divide(
+                    letters, non_spaces,
+                    out=np.zeros(len(texts), dtype=float),
+                    where=non_spaces > 0
+                )
+                is_skipped = is_text & ((letters < self.min_letters) | (letter_ratio < self.min_letter_ratio))
+            else:
+                is_skipped = is_text & texts.str.fullmatch(self.patterns[rule]).to_numpy(dtype=bool)
+
+            skip_rules[pending & is_skipped] = rule
+        return skip_rules
+
+
+    def filter(self, values):
+        """
+        Returns:
+            Tuple[np.ndarray, Dict[str, int]]: Boolean mask of the values to check, number of values skipped per rule
+        """
+        skip_rules = self.classify(values)
+        keep_mask = skip_rules == None  # noqa: E711
+        rule_names, counts = np.unique(skip_rules[~keep_mask].astype(str), return_counts=True)
+        return keep_mask, dict(zip(rule_names.tolist(), counts.tolist()))
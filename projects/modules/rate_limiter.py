@@ -0,0 +1,129 @@
+import time
+import asyncio
+import threading
+
+
+class TokenBucket:
+    def __init__(self, capacity: float, refill_per_second: float):
+        """
+        Token bucket that may go negative, so an under-estimated charge is paid back later
+
+        Args:
+            capacity (float): Maximum number of tokens in the bucket
+            refill_per_second (float): Tokens added every second
+        """
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.refill_per_second)
+        self.updated = now
+
+    def time_until(self, amount: float) -> float:
+        # A request larger than the bucket only waits for a full bucket
+        amount = min(amount, self.capacity)
+        missing = amount - self.tokens
+        if missing <= 0:
+            return 0.0
+        return missing / self.refill_per_second
+
+    def consume(self, amount: float):
+        self.tokens -= amount
+
+    def refund(self, amount: float):
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class AzureQuotaLimiter:
+    def __init__(self, tokens_per_minute: int, requests_per_minute: int):
+        """
+        Dual token bucket matching an Azure deployment quota (TPM + RPM)
+
+        Thread safe and loop agnostic: waiting is done with `asyncio.sleep`, so one limiter
+        can be shared by every check running in the process.
+
+        Args:
+            tokens_per_minute (int): TPM quota of the deployment
+            requests_per_minute (int): RPM quota of the deployment
+        """
+        self.tokens_per_minute = tokens_per_minute
+        self.requests_per_minute = requests_per_minute
+        self.token_bucket = TokenBucket(tokens_per_minute, tokens_per_minute / 60)
+        self.request_bucket = TokenBucket(requests_per_minute, requests_per_minute / 60)
+        self.lock = threading.Lock()
+        self.total_estimated_tokens = 0
+        self.total_actual_tokens = 0
+        self.total_requests = 0
+
+
+    async def acquire(self, estimated_tokens: int):
+        """Wait until both buckets can pay for one request of `estimated_tokens`"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.token_bucket.refill(now)
+                self.request_bucket.refill(now)
+                wait_time = max(
+                    self.token_bucket.time_until(estimated_tokens),
+                    self.request_bucket.time_until(1)
+                )
+                if wait_time <= 0:
+                    self.token_bucket.consume(estimated_tokens)
+                    self.request_bucket.consume(1)
+                    self.total_estimated_tokens += estimated_tokens
+                    self.total_requests += 1
+                    return
+            await asyncio.sleep(wait_time)
+
+
+    def reconcile(self, estimated_tokens: int, actual_tokens: int):
+        """Correct the up-front charge with the usage reported by the response"""
+        with self.lock:
+            self.total_actual_tokens += actual_tokens
+            difference = estimated_tokens - actual_tokens
+            if difference > 0:
+                self.token_bucket.refund(difference)
+            else:
+                self.token_bucket.consume(-difference)
+
+
+    def cancel(self, estimated_tokens: int):
+        """Give back a charge for a request the endpoint rejected without counting it"""
+        with self.lock:
+            self.total_estimated_tokens -= estimated_tokens
+            self.total_requests -= 1
+            self.token_bucket.refund(estimated_tokens)
+            self.request_bucket.refund(1)
+
+
+    def get_state(self) -> dict:
+        with self.lock:
+            now = time.monotonic()
+            self.token_bucket.refill(now)
+            self.request_bucket.refill(now)
+            return {
+                "tokens_per_minute": self.tokens_per_minute,
+                "requests_per_minute": self.requests_per_minute,
+                "available_tokens": int(self.token_bucket.tokens),
+                "available_requests": int(self.request_bucket.tokens),
+                "total_requests": self.total_requests,
+                "total_estimated_tokens": self.total_estimated_tokens,
+                "total_actual_tokens": self.total_actual_tokens,
+            }
+
+
+#-- SHARED LIMITERS
+_shared_limiters = {}
+_shared_limiters_lock = threading.Lock()
+
+def get_shared_limiter(name: str, tokens_per_minute: int, requests_per_minute: int) -> AzureQuotaLimiter:
+    """One limiter per deployment for the whole process"""
+    with _shared_limiters_lock:
+        if name not in _shared_limiters:
+            _shared_limiters[name] = AzureQuotaLimiter(
+                tokens_per_minute=tokens_per_minute,
+                requests_per_minute=requests_per_minute
+            )
+        return _shared_limiters[name]
@@ -0,0 +1,131 @@
+import time
+import random
+import asyncio
+import threading
+
+import openai
+
+from projects.modules.concurrency import is_throttle_error
+
+
+class CircuitOpenError(Exception):
+    """Raised without calling the endpoint while the circuit breaker is open"""
+
+
+class IncompleteCheckError(Exception):
+    """Raised at the end of a check when some batches failed, after every successful batch was yielded"""
+
+    def __init__(self, failed_batches: int, batches_total: int, last_error: Exception):
+        self.failed_batches = failed_batches
+        self.batches_total = batches_total
+        self.last_error = last_error
+        super().__init__(f"{failed_batches} of {batches_total} batches failed, last error: {last_error}")
+
+
+#-- ERROR CLASSIFICATION
+def is_outage_error(error: Exception) -> bool:
+    """5xx, connection errors and timeouts: the endpoint is failing, not just saturated"""
+    if isinstance(error, (openai.APIConnectionError, openai.InternalServerError, asyncio.TimeoutError)):
+        return True
+    status_code = getattr(error, "status_code", None)
+    return status_code is not None and status_code >= 500
+
+
+def is_retryable_error(error: Exception) -> bool:
+    """429, 5xx and timeouts are worth another try, anything else (400, 401, 404, ...) is fatal"""
+    return is_throttle_error(error) or is_outage_error(error)
+
+
+class RetryPolicy:
+    def __init__(self, max_retries: int = 5, base_delay: float = 0.5, max_delay: float = 30.0):
+        """
+        Exponential backoff with full jitter: attempt n waits a random delay in [0, min(max_delay, base_delay * 2^n)]
+
+        Args:
+            max_retries (int): Retries after the first attempt
+            base_delay (float): Backoff ceiling of the first retry, in seconds
+            max_delay (float): Cap of the backoff ceiling, in seconds
+        """
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+
+    def get_delay(self, attempt: int, retry_after=None) -> float:
+        """A Retry-After sent by the endpoint wins over the computed backoff"""
+        if retry_after:
+            return retry_after
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        """
+        Fail fast once the endpoint is clearly down
+
+        closed -> open after `failure_threshold` consecutive outage errors. While open, calls raise
+        CircuitOpenError. After `reset_timeout` seconds one trial call is let through (half open):
+        success closes the circuit, another outage error opens it again.
+
+        Args:
+            failure_threshold (int): Consecutive outage errors that open the circuit
+            reset_timeout (float): Seconds before a trial call is allowed
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.trial_in_flight = False
+        self.total_rejected = 0
+        self.lock = threading.Lock()
+
+
+    def before_call(self):
+        with self.lock:
+            if self.state == "open":
+                remaining = self.reset_timeout - (time.monotonic() - self.opened_at)
+                if remaining > 0:
+                    self.total_rejected += 1
+                    raise CircuitOpenError(f"Endpoint considered down, circuit open for {remaining:.1f}s more")
+                self.state = "half_open"
+                self.trial_in_flight = False
+
+            if self.state == "half_open":
+                if self.trial_in_flight:
+                    self.total_rejected += 1
+                    raise CircuitOpenError("Endpoint considered down, waiting for the trial call")
+                self.trial_in_flight = True
+
+
+    def record_success(self):
+        """Any answer from the endpoint, including 4xx, proves it is up"""
+        with self.lock:
+            self.state = "closed"
+            self.consecutive_failures = 0
+            self.trial_in_flight = False
+
+
+    def cancel_call(self):
+        """The call was abandoned before any answer, a pending trial slot is given back"""
+        with self.lock:
+            self.trial_in_flight = False
+
+
+    def record_failure(self):
+        with self.lock:
+            self.consecutive_failures += 1
+            self.trial_in_flight = False
+            if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+
+    def get_state(self) -> dict:
+        with self.lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "total_rejected": self.total_rejected,
+            }
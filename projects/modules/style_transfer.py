@@ -0,0 +1,153 @@
+import threading
+from typing import Dict, List, Tuple
+
+
+STYLE_ATTRIBUTES = ("bold", "italic", "color", "size", "name")
+
+
+def get_word_spans(text: str) -> List[Tuple[int, int]]:
+    """
+    Character span of every word of `text` split on " ", the separating space belongs to the word before it
+
+    Examples:
+        get_word_spans("teh cat")
+        # [(0, 4), (4, 7)]
+    """
+    spans = []
+    start = 0
+    for word in text.split(" "):
+        end = min(start + len(word) + 1, len(text))
+        spans.append((start, end))
+        start = end
+    return spans
+
+
+def build_style_runs(spans: List[Tuple[int, int]], word_styles: Dict[int, dict], base_style: dict = None) -> List[Tuple[int, int, dict]]:
+    """
+    Contiguous character runs sharing one style
+
+    Args:
+        spans (List[Tuple[int, int]]): Character span of every word of the new text
+        word_styles (Dict[int, dict]): Style to give to a word, by word index. Words left out keep the cell style
+        base_style (dict): Style the whole text has after the value was written, runs equal to it are dropped.
+            None keeps every run
+
+    Returns:
+        List[Tuple[int, int, dict]]: (start, end, style) runs, end excluded
+
+    Examples:
+        build_style_runs([(0, 4), (4, 8), (8, 11)], {0: bold, 1: bold, 2: plain}, base_style=plain)
+        # [(0, 8, bold)]
+    """
+    runs = []
+    for word_idx in sorted(word_styles):
+        start, end = spans[word_idx]
+        if start >= end:
+            continue
+        style = word_styles[word_idx]
+        if runs and runs[-1][1] == start and runs[-1][2] == style:
+            runs[-1][1] = end
+        else:
+            runs.append([start, end, style])
+    return [(start, end, style) for start, end, style in runs if base_style is None or style != base_style]
+
+
+class StyleTransfer:
+    def __init__(self):
+        """
+        Carry the character formatting of a cell over to its corrected text with few Excel calls
+
+        The word styles of the original text are read once, the new text layout is computed in memory
+        and styles are written with one `characters[start:end]` call per contiguous style run, instead
+        of one call per character and attribute.
+
+        Every Excel call (font lookup, attribute read or write) is counted, next to the number of calls
+        the per-character transfer would have made on the same cells.
+
+        Examples:
+            style_transfer = StyleTransfer()
+            style_transfer.transfer(sheet.range("B2"), "the cat sat", common_root=[1, 2], common_modify=[1, 2])
+            style_transfer.get_counts()
+            # {"cells": 1, "runs": 0, "excel_calls": 20, "per_character_calls": 80}
+        """
+        self.counts = {"cells": 0, "runs": 0, "excel_calls": 0, "per_character_calls": 0}
+        self.lock = threading.Lock()
+
+
+    #-- EXCEL IO
+    def read_style(self, characters) -> Tuple[dict, int]:
+        font = characters.font
+        return {attr: getattr(font, attr) for attr in STYLE_ATTRIBUTES}, 1 + len(STYLE_ATTRIBUTES)
+
+
+    def write_style(self, characters, style: dict) -> int:
+        font = characters.font
+        for attr, value in style.items():
+            setattr(font, attr, value)
+        return 1 + len(style)
+
+
+    #-- TRANSFER
+    def transfer(self, cell, new_value: str, common_root, common_modify) -> dict:
+        """
+        Write `new_value` into `cell`, keeping the style of every word matched with the original text
+
+        Args:
+            cell (xlwings.Range): Cell holding the original text
+            new_value (str): Corrected text
+            common_root (Sequence[int]): Word indices in the original text
+            common_modify (Sequence[int]): Matching word indices in the corrected text
+
+        Returns:
+            dict: Counts of this cell (runs, excel_calls, per_character_calls)
+        """
+        old_value = cell.value
+        excel_calls = 1
+        root_styles = {}
+        if isinstance(old_value, str) and old_value:
+            old_spans = get_word_spans(old_value)
+            for word_idx in sorted(set(int(idx) for idx in common_root)):
+                if old_spans[word_idx][0] >= len(old_value):
+                    continue
+                root_styles[word_idx], calls = self.read_style(cell.characters[old_spans[word_idx][0]])
+                excel_calls += calls
+
+        cell.value = new_value
+        excel_calls += 1
+        if not root_styles or not new_value:
+            return self.record(runs=0, excel_calls=excel_calls, per_character_calls=excel_calls)
+
+        #~ Writing the value leaves the whole text in one style, only runs that differ need a call
+        base_style, calls = self.read_style(cell.characters[0])
+        excel_calls += calls
+
+        new_spans = get_word_spans(new_value)
+        word_styles = {
+            int(modify_idx): root_styles[int(root_idx)]
+            for root_idx, modify_idx in zip(common_root, common_modify)
+            if int(root_idx) in root_styles
+        }
+        runs = build_style_runs(new_spans, word_styles, base_style)
+        for start, end, style in runs:
+            excel_calls += self.write_style(cell.characters[start:end], style)
+
+        #~ Former transfer: word styles read on both texts, then every character of a matched word set one attribute at a time
+        per_style_calls = 1 + len(STYLE_ATTRIBUTES)
+        per_character_calls = 2 + per_style_calls * (len(get_word_spans(old_value)) + len(new_spans))
+        per_character_calls += per_style_calls * sum(new_spans[idx][1] - new_spans[idx][0] for idx in word_styles)
+        return self.record(runs=len(runs), excel_calls=excel_calls, per_character_calls=per_character_calls)
+
+
+    #-- STATS
+    def record(self, runs: int, excel_calls: int, per_character_calls: int) -> dict:
+        with self.lock:
+            self.counts["cells"] += 1
+            self.counts["runs"] += runs
+            self.counts["excel_calls"] += excel_calls
+            self.counts["per_character_calls"] += per_character_calls
+        return {"runs": runs, "excel_calls": excel_calls, "per_character_calls": per_character_calls}
+
+
+    def get_counts(self) -> dict:
+        with self.lock:
+            return dict(self.counts)
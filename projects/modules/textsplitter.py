@@ -1,10 +1,14 @@
+import re
+from typing import List
+
 from langchain.text_splitter import CharacterTextSplitter
 
 class TextSplitter():
-    def __init__(self):
+    def __init__(self, chunk_size=1000):
+        self.chunk_size = chunk_size
         self.splitter = CharacterTextSplitter(
             separator="\n",
-            chunk_size=1000,
+            chunk_size=chunk_size,
             chunk_overlap=0,
             keep_separator=True,
             strip_whitespace=True
@@ -13,3 +17,34 @@ class TextSplitter():
     def split_documents(self, docs):
         return self.splitter.split_text(docs)
 
+    def split_text_exact(self, text: str) -> List[str]:
+        """
+        Split at line boundaries, then sentence boundaries, then whitespace, into chunks of at most
+        `chunk_size` characters (unless a single word is longer). Nothing is stripped:
+        "".join(chunks) == text
+
+        Examples:
+            TextSplitter(chunk_size=12).split_text_exact("One. Two.\\nThree four five.")
+            # ["One. Two.\\n", "Three four", " five."]
+        """
+        units = []
+        for line in re.split(r"(?<=\n)", text):
+            if len(line) <= self.chunk_size:
+                units.append(line)
+                continue
+            for sentence in re.split(r"(?<=[.!?;:])(?=\s)", line):
+                if len(sentence) <= self.chunk_size:
+                    units.append(sentence)
+                else:
+                    units.extend(re.split(r"(?<=\S)(?=\s)", sentence))
+
+        chunks = []
+        current = ""
+        for unit in units:
+            if current and len(current) + len(unit) > self.chunk_size:
+                chunks.append(current)
+                current = ""
+            current += unit
+        if current:
+            chunks.append(current)
+        return chunks
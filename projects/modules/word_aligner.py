@@ -0,0 +1,198 @@
+from collections import Counter
+from bisect import bisect_left
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+
+def align_words(words_a: Sequence[str], words_b: Sequence[str]) -> List[Tuple[int, int]]:
+    """
+    Patience-diff word alignment: common prefix / suffix are matched first, then words that occur
+    exactly once on both sides anchor the alignment (longest increasing run of anchors) and the
+    gaps between anchors are aligned the same way. Regions without unique words fall back to Myers.
+
+    Near-identical texts, the usual case of a grammar correction, are aligned in linear time.
+
+    Args:
+        words_a (Sequence[str]): Words of the original text
+        words_b (Sequence[str]): Words of the corrected text
+
+    Returns:
+        List[Tuple[int, int]]: Matched (index in a, index in b) pairs, increasing on both sides
+
+    Examples:
+        align_words("teh cat sat".split(" "), "the cat sat".split(" "))
+        # [(1, 1), (2, 2)]
+    """
+    matches = []
+    regions = [(0, len(words_a), 0, len(words_b))]
+    while regions:
+        a_low, a_high, b_low, b_high = regions.pop()
+
+        #~ Common prefix and suffix
+        while a_low < a_high and b_low < b_high and words_a[a_low] == words_b[b_low]:
+            matches.append((a_low, b_low))
+            a_low += 1
+            b_low += 1
+        while a_low < a_high and b_low < b_high and words_a[a_high - 1] == words_b[b_high - 1]:
+            a_high -= 1
+            b_high -= 1
+            matches.append((a_high, b_high))
+        if a_low == a_high or b_low == b_high:
+            continue
+
+        anchors = find_unique_anchors(words_a, words_b, a_low, a_high, b_low, b_high)
+        if not anchors:
+            matches.extend(myers_matches(words_a, words_b, a_low, a_high, b_low, b_high))
+            continue
+
+        #~ Anchors are matched, the gaps around them are new regions
+        previous_a, previous_b = a_low, b_low
+        for anchor_a, anchor_b in anchors:
+            regions.append((previous_a, anchor_a, previous_b, anchor_b))
+            matches.append((anchor_a, anchor_b))
+            previous_a, previous_b = anchor_a + 1, anchor_b + 1
+        regions.append((previous_a, a_high, previous_b, b_high))
+
+    matches.sort()
+    return matches
+
+
+def find_unique_anchors(words_a, words_b, a_low, a_high, b_low, b_high) -> List[Tuple[int, int]]:
+    """Words occurring once in both regions, reduced to their longest increasing sequence in b"""
+    counts_a = Counter(words_a[a_low:a_high])
+    counts_b = Counter(words_b[b_low:b_high])
+    positions_b = {
+        words_b[index]: index for index in range(b_low, b_high)
+        if counts_b[words_b[index]] == 1 and counts_a[words_b[index]] == 1
+    }
+    pairs = [
+        (index, positions_b[words_a[index]]) for index in range(a_low, a_high)
+        if words_a[index] in positions_b
+    ]
+    return longest_increasing_pairs(pairs)
+
+
+def longest_increasing_pairs(pairs: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """Patience sorting on the b index of pairs already sorted by a, O(k log k)"""
+    tails = []
+    tail_indices = []
+    parents = [-1] * len(pairs)
+    for pair_index, (_, index_b) in enumerate(pairs):
+        pile = bisect_left(tails, index_b)
+        if pile == len(tails):
+            tails.append(index_b)
+            tail_indices.append(pair_index)
+        else:
+            tails[pile] = index_b
+            tail_indices[pile] = pair_index
+        parents[pair_index] = tail_indices[pile - 1] if pile > 0 else -1
+
+    sequence = []
+    pair_index = tail_indices[-1] if tail_indices else -1
+    while pair_index >= 0:
+        sequence.append(pairs[pair_index])
+        pair_index = parents[pair_index]
+    return sequence[::-1]
+
+
+def myers_matches(words_a, words_b, a_low, a_high, b_low, b_high) -> List[Tuple[int, int]]:
+    """
+    Myers O((N + M) * D) shortest edit script on one region, returns the matched pairs
+
+    Only regions without any unique common word get here, which keeps N and D small in practice.
+    """
+    a = words_a[a_low:a_high]
+    b = words_b[b_low:b_high]
+    if not set(a) & set(b):
+        return []
+
+    n, m = len(a), len(b)
+    offset = n + m
+    frontier = [0] * (2 * offset + 2)
+    trace = []
+    for edit_count in range(offset + 1):
+        trace.append(frontier[:])
+        for diagonal in range(-edit_count, edit_count + 1, 2):
+            if diagonal == -edit_count or (
+                diagonal != edit_count and frontier[offset + diagonal - 1] < frontier[offset + diagonal + 1]
+            ):
+                x = frontier[offset + diagonal + 1]
+            else:
+                x = frontier[offset + diagonal - 1] + 1
+            y = x - diagonal
+            while x < n and y < m and a[x] == b[y]:
+                x += 1
+                y += 1
+            frontier[offset + diagonal] = x
+            if x >= n and y >= m:
+                return backtrack_myers(trace, offset, n, m, a_low, b_low)
+    return []
+
+
+def backtrack_myers(trace, offset, n, m, a_low, b_low) -> List[Tuple[int, int]]:
+    matches = []
+    x, y = n, m
+    for edit_count in range(len(trace) - 1, -1, -1):
+        frontier = trace[edit_count]
+        diagonal = x - y
+        if diagonal == -edit_count or (
+            diagonal != edit_count and frontier[offset + diagonal - 1] < frontier[offset + diagonal + 1]
+        ):
+            previous_diagonal = diagonal + 1
+        else:
+            previous_diagonal = diagonal - 1
+        previous_x = frontier[offset + previous_diagonal]
+        previous_y = previous_x - previous_diagonal
+
+        while x > previous_x and y > previous_y:
+            x -= 1
+            y -= 1
+            matches.append((a_low + x, b_low + y))
+        if edit_count > 0:
+            x, y = previous_x, previous_y
+    return matches[::-1]
+
+
+#-- TEXT HELPERS
+def find_common_runs(string_a: str, string_b: str) -> List[Tuple[str, int, int, int, int]]:
+    """
+    Common word runs of two texts (words split on " ")
+
+    Returns:
+        List[Tuple[str, int, int, int, int]]: (substring, start_a, end_a, start_b, end_b) of every run
+    """
+    list_a = string_a.split(" ")
+    list_b = string_b.split(" ")
+
+    #~ Group consecutive matched pairs into runs
+    runs = []
+    for index_a, index_b in align_words(list_a, list_b):
+        if runs and runs[-1][1] == index_a and runs[-1][3] == index_b:
+            runs[-1][1] += 1
+            runs[-1][3] += 1
+        else:
+            runs.append([index_a, index_a + 1, index_b, index_b + 1])
+    return [(" ".join(list_a[sa:ea]), sa, ea, sb, eb) for sa, ea, sb, eb in runs]
+
+
+def get_common_missing_idx(string_a: str, string_b: str):
+    """
+    Word indices kept and changed between an original text and its correction
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, List]:
+            common_a, common_b (paired index by index), missing_a, missing_b, common runs
+    """
+    result = find_common_runs(string_a, string_b)
+    string_a_idx_mask = np.zeros(len(string_a.split(" ")), dtype=bool)
+    string_b_idx_mask = np.zeros(len(string_b.split(" ")), dtype=bool)
+    for _, sa, ea, sb, eb in result:
+        string_a_idx_mask[sa:ea] = True
+        string_b_idx_mask[sb:eb] = True
+
+    common_a = np.flatnonzero(string_a_idx_mask)
+    common_b = np.flatnonzero(string_b_idx_mask)
+    missing_a = np.flatnonzero(~string_a_idx_mask)
+    missing_b = np.flatnonzero(~string_b_idx_mask)
+    return common_a, common_b, missing_a, missing_b, result
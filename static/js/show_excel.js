@@ -33,19 +33,27 @@ function requestCheckSheetGrammar(formID, sheetName) {
     form.addEventListener("submit", event => {
         event.preventDefault();
 
-        // Open Spinner
+        // Open Spinner until the first batch arrives
         document.getElementById("loading-overlay").style.display = "block";
-        fetch("/check_grammar", {
+        updateGrammarPanel([]);
+        fetch("/check_grammar_stream", {
             method: "POST",
             headers: { "Content-Type": "application/json" },
             body: JSON.stringify({ sheet_name: sheetName })
         })
-        .then(res => res.json())
-        .then(results => {
-            console.log("Grammar results:", results);
-            document.getElementById("ss").innerHTML = results.iframe;
-            updateGrammarPanel(results.results);
-        })
+        .then(res => readNDJSONStream(res, message => {
+            if (message.type === "corrections") {
+                console.log(`Grammar batch ${message.batches_done}/${message.batches_total}:`, message.results);
+                document.getElementById("loading-overlay").style.display = "none";
+                updateGrammarPanel(message.results, true);
+            }
+            else if (message.type === "done") {
+                document.getElementById("ss").innerHTML = message.iframe;
+            }
+            else if (message.type === "error") {
+                console.error("Error checking grammar:", message.error);
+            }
+        }))
         .catch(err => console.error("Error checking grammar:", err))
         .finally(() => {
             // Turn off spinner
@@ -58,11 +66,87 @@ function requestCheckSheetGrammar(formID, sheetName) {
 
 
 
+/**
+ * Attaches whole-workbook grammar check to a form: submits a background job and polls its progress.
+ * @param {string} formID - The ID of the form element.
+ * @param {string} sheetName - The sheet to show once the job is done.
+ */
+function requestCheckWorkbookGrammar(formID, sheetName) {
+    const form = document.getElementById(formID);
+    if (!form) {
+        console.warn("Form not found:", formID);
+        return;
+    }
+
+    form.addEventListener("submit", event => {
+        event.preventDefault();
+
+        // Open Spinner
+        const overlay = document.getElementById("loading-overlay");
+        const overlayText = overlay.querySelector("p");
+        overlay.style.display = "block";
+
+        fetch("/submit_workbook_job", { method: "POST" })
+        .then(res => res.json())
+        .then(({ job_id }) => {
+            const timer = setInterval(() => {
+                fetch(`/grammar_job_status?job_id=${job_id}`)
+                .then(res => res.json())
+                .then(job => {
+                    overlayText.textContent = `Checked ${job.batches_done}/${job.batches_total} batches, ${job.cells_corrected} corrections`;
+                    if (["done", "failed", "cancelled"].includes(job.status)) {
+                        clearInterval(timer);
+                        overlay.style.display = "none";
+                        overlayText.textContent = "Pending ...";
+                        if (job.status === "done") {
+                            window.location.href = `/show_sheet?sheet=${encodeURIComponent(sheetName)}`;
+                        } else {
+                            console.error("Workbook check ended:", job.status, job.error);
+                        }
+                    }
+                })
+                .catch(err => console.error("Error polling workbook check:", err));
+            }, 2000);
+        })
+        .catch(err => {
+            console.error("Error checking workbook:", err);
+            overlay.style.display = "none";
+        });
+    });
+}
+
+
+/**
+ * Reads a newline-delimited JSON response and calls onMessage for each line as it arrives.
+ * @param {Response} response - The fetch response.
+ * @param {Function} onMessage - Callback receiving each parsed message.
+ */
+async function readNDJSONStream(response, onMessage) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        const lines = buffer.split("\n");
+        buffer = lines.pop();
+        lines.filter(line => line.trim()).forEach(line => onMessage(JSON.parse(line)));
+    }
+    if (buffer.trim()) {
+        onMessage(JSON.parse(buffer));
+    }
+}
+
+
 /**
  * Updates the grammar correction panel with given results.
  * @param {Array} correctionResults - List of grammar corrections.
+ * @param {boolean} append - Keep the current items and add the new ones after them.
  */
-function updateGrammarPanel(correctionResults = []) {
+function updateGrammarPanel(correctionResults = [], append = false) {
     const errorList = document.getElementById("error-list");
     const rejectList = document.getElementById("rejected-list");
     if (!errorList) {
@@ -75,8 +159,10 @@ function updateGrammarPanel(correctionResults = []) {
     }
 
     console.log("Updating grammar panel with results:", correctionResults);
-    errorList.innerHTML = ""; // Clear previous results
-    rejectList.innerHTML = ""; // Clear previous results
+    if (!append) {
+        errorList.innerHTML = ""; // Clear previous results
+        rejectList.innerHTML = ""; // Clear previous results
+    }
 
     correctionResults.forEach(item => {
         const { old_value, new_value, cell, is_reject } = item || {};
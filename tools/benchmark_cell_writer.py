@@ -0,0 +1,105 @@
+"""
+Benchmark of the correction writers: openpyxl rich text vs xlwings (running Excel instance).
+
+A workbook of rich-text cells with misspellings is generated, every cell is corrected in one writer
+session and saved once. The xlwings run is skipped when no Excel instance can be started.
+
+Usage:
+    python tools/benchmark_cell_writer.py
+    python tools/benchmark_cell_writer.py --cells 50 500 2000 --words 40 --output save/benchmark
+"""
+import os
+import sys
+import time
+import random
+import shutil
+import argparse
+
+from openpyxl import Workbook
+from openpyxl.cell.rich_text import CellRichText, TextBlock
+from openpyxl.cell.text import InlineFont
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from projects.modules.cell_writer import CELL_WRITERS
+from projects.modules.style_transfer import StyleTransfer
+from projects.modules.word_aligner import get_common_missing_idx
+
+
+VOCABULARY = ["the", "system", "shall", "log", "every", "fault", "state", "of", "signal", "after", "reset", "teh", "recieve"]
+FIXES = {"teh": "the", "recieve": "receive"}
+FONTS = [None, InlineFont(b=True), InlineFont(i=True), InlineFont(color="FFC00000")]
+
+
+def make_workbook(path, n_cells, n_words, rng):
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Sheet1"
+    corrections = []
+    for row in range(1, n_cells + 1):
+        words = [rng.choice(VOCABULARY) for _ in range(n_words)]
+        text = " ".join(words)
+
+        #~ A few formatting runs per cell
+        blocks = []
+        start = 0
+        while start < len(words):
+            end = min(len(words), start + rng.randint(3, 10))
+            chunk = " ".join(words[start:end]) + (" " if end < len(words) else "")
+            font = rng.choice(FONTS)
+            blocks.append(chunk if font is None else TextBlock(font, chunk))
+            start = end
+        ws.cell(row=row, column=1).value = CellRichText(blocks)
+
+        new_text = " ".join(FIXES.get(word, word) for word in words)
+        if new_text != text:
+            corrections.append(("Sheet1", f"A{row}", text, new_text))
+    wb.save(path)
+    return corrections
+
+
+def run_writer(backend, path, corrections):
+    style_transfer = StyleTransfer()
+    started_at = time.perf_counter()
+    cell_writer = CELL_WRITERS[backend](path, style_transfer=style_transfer)
+    try:
+        for sheet_name, cell_address, old_value, new_value in corrections:
+            common_old, common_new, _, _, _ = get_common_missing_idx(old_value, new_value)
+            cell_writer.set_value(sheet_name, cell_address, new_value, common_old, common_new)
+        cell_writer.save()
+    finally:
+        cell_writer.close()
+    return time.perf_counter() - started_at, style_transfer.get_counts()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cells", type=int, nargs="+", default=[50, 500, 2000])
+    parser.add_argument("--words", type=int, default=40, help="Words per cell")
+    parser.add_argument("--output", default="save/benchmark", help="Directory of the generated workbooks")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+    os.makedirs(args.output, exist_ok=True)
+
+    print(f"{'cells':>6} {'corrected':>10} {'backend':>9} {'seconds':>9} {'ms/cell':>8}  excel calls")
+    for n_cells in args.cells:
+        source_path = os.path.abspath(os.path.join(args.output, f"cells_{n_cells}.xlsx"))
+        corrections = make_workbook(source_path, n_cells, args.words, rng)
+
+        for backend in CELL_WRITERS:
+            path = source_path.replace(".xlsx", f"_{backend}.xlsx")
+            shutil.copyfile(source_path, path)
+            try:
+                seconds, counts = run_writer(backend, path, corrections)
+            except Exception as e:
+                print(f"{n_cells:>6} {len(corrections):>10} {backend:>9} {'skipped':>9} {'':>8}  ({type(e).__name__}: {str(e)[:60]})")
+                continue
+            excel_calls = f"{counts['excel_calls']} (per-character: {counts['per_character_calls']})" if counts["cells"] else "-"
+            print(
+                f"{n_cells:>6} {len(corrections):>10} {backend:>9} {seconds:>9.3f} "
+                f"{1000 * seconds / max(len(corrections), 1):>8.2f}  {excel_calls}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+Benchmark of text-cell extraction: sharedStrings.xml scanner vs load_excel_wb + iter_rows.
+
+A workbook of prose, numbers and codes is generated (or an existing one is given), the text cells
+found by both paths are compared and their extraction times reported.
+
+Usage:
+    python tools/benchmark_shared_strings.py
+    python tools/benchmark_shared_strings.py --rows 20000 --cols 10 --sheets 3
+    python tools/benchmark_shared_strings.py --path save/big_workbook.xlsx
+"""
+import os
+import sys
+import time
+import random
+import zipfile
+import argparse
+from xml.sax.saxutils import escape
+
+from openpyxl.utils import get_column_letter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.excel_utils import load_excel_wb
+from utils.xlsx_scanner import scan_workbook_strings, MAIN_NS, REL_NS, PACKAGE_REL_NS
+
+
+SENTENCES = [
+    "Teh system shall log every fault.",
+    "The operator recieve an alarm after reset.",
+    "Signal state is checked every cycle.",
+    "Data is stored in non volatile memory",
+    "N/A",
+    "Values < 5 & > 2 are \"valid\"",
+    "Température réglée à 20 °C",
+]
+
+
+def make_workbook(path, n_sheets, n_rows, n_cols, rng):
+    """Minimal SpreadsheetML package with a shared string table, laid out like files saved by Excel"""
+    shared_strings = {}
+    sheets_xml = []
+    for _ in range(n_sheets):
+        rows_xml = []
+        for row_idx in range(n_rows):
+            cells_xml = []
+            for col_idx in range(n_cols):
+                reference = f"{get_column_letter(col_idx + 1)}{row_idx + 1}"
+                draw = rng.random()
+                if draw < 0.3:
+                    continue
+                if draw < 0.5:
+                    cells_xml.append(f'<c r="{reference}"><v>{rng.random() * 1000}</v></c>')
+                    continue
+                if draw < 0.6:
+                    text = f"REQ-{row_idx:05d}-{col_idx}"
+                else:
+                    # Mostly repeated prose, some unique texts
+                    sentence = rng.choice(SENTENCES)
+                    text = sentence if rng.random() < 0.8 else f"{sentence} Row {row_idx}."
+                index = shared_strings.setdefault(text, len(shared_strings))
+                cells_xml.append(f'<c r="{reference}" t="s"><v>{index}</v></c>')
+            rows_xml.append(f'<row r="{row_idx + 1}">{"".join(cells_xml)}</row>')
+        sheets_xml.append(
+            f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            f'<worksheet xmlns="{MAIN_NS}"><sheetData>{"".join(rows_xml)}</sheetData></worksheet>'
+        )
+
+    strings_xml = "".join(f"<si><t>{escape(text)}</t></si>" for text in shared_strings)
+    sheet_range = range(1, n_sheets + 1)
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("[Content_Types].xml", (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            + "".join(
+                f'<Override PartName="/xl/worksheets/sheet{i}.xml" '
+                f'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+                for i in sheet_range
+            )
+            + '<Override PartName="/xl/sharedStrings.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"/>'
+            '</Types>'
+        ))
+        archive.writestr("_rels/.rels", (
+            f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?><Relationships xmlns="{PACKAGE_REL_NS}">'
+            f'<Relationship Id="rId1" Type="{REL_NS}/officeDocument" Target="xl/workbook.xml"/></Relationships>'
+        ))
+        archive.writestr("xl/workbook.xml", (
+            f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?><workbook xmlns="{MAIN_NS}" xmlns:r="{REL_NS}"><sheets>'
+            + "".join(f'<sheet name="Sheet{i}" sheetId="{i}" r:id="rId{i}"/>' for i in sheet_range)
+            + "</sheets></workbook>"
+        ))
+        archive.writestr("xl/_rels/workbook.xml.rels", (
+            f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?><Relationships xmlns="{PACKAGE_REL_NS}">'
+            + "".join(
+                f'<Relationship Id="rId{i}" Type="{REL_NS}/worksheet" Target="worksheets/sheet{i}.xml"/>'
+                for i in sheet_range
+            )
+            + f'<Relationship Id="rId{n_sheets + 1}" Type="{REL_NS}/sharedStrings" Target="sharedStrings.xml"/>'
+            "</Relationships>"
+        ))
+        for i, sheet_xml in zip(sheet_range, sheets_xml):
+            archive.writestr(f"xl/worksheets/sheet{i}.xml", sheet_xml)
+        archive.writestr("xl/sharedStrings.xml", (
+            f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            f'<sst xmlns="{MAIN_NS}" count="{len(shared_strings)}" uniqueCount="{len(shared_strings)}">{strings_xml}</sst>'
+        ))
+
+
+def openpyxl_text_cells(path):
+    wb = load_excel_wb(path=path)
+    return {
+        (sheet_name, (x, y), value)
+        for sheet_name in wb.sheetnames
+        for x, row in enumerate(wb[sheet_name].iter_rows(values_only=True))
+        for y, value in enumerate(row)
+        if isinstance(value, str)
+    }
+
+
+def scanner_text_cells(path):
+    texts, text_cells = scan_workbook_strings(path)
+    return {
+        (sheet_name, coordinates, text)
+        for text, cells in zip(texts, text_cells)
+        for sheet_name, coordinates in cells
+    }, len(texts)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--path", default=None, help="Existing workbook, a synthetic one is generated otherwise")
+    parser.add_argument("--sheets", type=int, default=2)
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--cols", type=int, default=8)
+    parser.add_argument("--output", default="save/benchmark")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    path = args.path
+    if path is None:
+        os.makedirs(args.output, exist_ok=True)
+        path = os.path.join(args.output, f"shared_strings_{args.sheets}x{args.rows}x{args.cols}.xlsx")
+        make_workbook(path, args.sheets, args.rows, args.cols, random.Random(args.seed))
+    print(f"Workbook: {path} ({os.path.getsize(path) / 1e6:.1f} MB)")
+
+    started_at = time.perf_counter()
+    expected = openpyxl_text_cells(path)
+    openpyxl_seconds = time.perf_counter() - started_at
+
+    started_at = time.perf_counter()
+    found, unique_count = scanner_text_cells(path)
+    scanner_seconds = time.perf_counter() - started_at
+
+    print(f"load_excel_wb + iter_rows: {openpyxl_seconds:8.3f}s  {len(expected)} text cells")
+    print(f"sharedStrings scanner:     {scanner_seconds:8.3f}s  {len(found)} text cells, {unique_count} unique texts")
+    print(f"speedup: {openpyxl_seconds / scanner_seconds:.1f}x")
+    if found != expected:
+        print(f"MISMATCH: {len(expected - found)} cells missed, {len(found - expected)} cells not in openpyxl")
+        sys.exit(1)
+    print("Same text cells on both paths")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+"""
+Equivalence check and micro-benchmark of the word aligner used to carry styles across a correction.
+
+Compares `projects.modules.word_aligner.get_common_missing_idx` with the former O(n*m) DP +
+O(k^2) maximal-substring filter (kept below as the reference) on synthetic corrected cells.
+
+Every alignment of the new aligner must be a valid pairing, and every difference with the
+reference must be one of the known reference defects listed in `KNOWN_DIFFERENCES`. The script
+exits with status 1 otherwise.
+
+Usage:
+    python tools/benchmark_word_aligner.py
+    python tools/benchmark_word_aligner.py --sizes 10 100 500 2000 --legacy-max-words 500 --cases 200
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from projects.modules.word_aligner import get_common_missing_idx
+
+
+#-- REFERENCE
+def legacy_find_all_common_substring(string_a, string_b):
+    list_a = string_a.split(" ")
+    list_b = string_b.split(" ")
+    n, m = len(list_a), len(list_b)
+
+    matrix = np.zeros((n+1, m+1), dtype=int)
+    for i in range(n):
+        for j in range(m):
+            if list_a[i] == list_b[j]:
+                matrix[i+1, j+1] = matrix[i, j] + 1
+
+    candidates = []
+    for i in range(1, n+1):
+        for j in range(1, m+1):
+            length = matrix[i, j]
+            if length > 0:
+                candidates.append((" ".join(list_a[i-length:i]), i - length, i, j - length, j))
+
+    maximal = [
+        (s, sa, ea, sb, eb) for s, sa, ea, sb, eb in candidates
+        if not any((s != t and s in t) for t, *_ in candidates)
+    ]
+
+    seen = set()
+    result = []
+    for item in maximal:
+        if item[0] not in seen:
+            result.append(item)
+            seen.add(item[0])
+    return result
+
+
+def legacy_get_common_missing_idx(string_a, string_b):
+    result = legacy_find_all_common_substring(string_a, string_b)
+    string_a_idx_mask = np.zeros(len(string_a.split(" ")), dtype=bool)
+    string_b_idx_mask = np.zeros(len(string_b.split(" ")), dtype=bool)
+    for _, sa, ea, sb, eb in result:
+        string_a_idx_mask[sa:ea] = True
+        string_b_idx_mask[sb:eb] = True
+    return (
+        np.flatnonzero(string_a_idx_mask),
+        np.flatnonzero(string_b_idx_mask),
+        np.flatnonzero(~string_a_idx_mask),
+        np.flatnonzero(~string_b_idx_mask),
+        result
+    )
+
+
+#-- SYNTHETIC CELLS
+def make_cell(rng, n_words, unique_words):
+    if unique_words:
+        # Distinct tokens: the reference is exact on such cells, apart from its substring filter
+        return [f"word{index}" for index in rng.sample(range(n_words * 10), n_words)]
+    vocabulary = ["the", "a", "system", "shall", "log", "fault", "state", "of", "and", "to", "signal", "reset"]
+    return [rng.choice(vocabulary) for _ in range(n_words)]
+
+
+def make_correction(rng, words, edit_rate=0.05):
+    corrected = []
+    for word in words:
+        draw = rng.random()
+        if draw < edit_rate / 3:
+            continue                                   # deletion
+        if draw < 2 * edit_rate / 3:
+            corrected.append(word + "s")               # substitution
+        elif draw < edit_rate:
+            corrected.extend([word, "inserted"])       # insertion
+        else:
+            corrected.append(word)
+    return corrected
+
+
+def is_valid_alignment(string_a, string_b, common_a, common_b):
+    words_a = string_a.split(" ")
+    words_b = string_b.split(" ")
+    return len(common_a) == len(common_b) and all(words_a[i] == words_b[j] for i, j in zip(common_a, common_b))
+
+
+#-- VALIDATION
+KNOWN_DIFFERENCES = {
+    "substring_filter": "reference drops a run whose text is a character substring of another run "
+                        "(\"word1\" inside \"word15 word3\"), its words are reported as changed",
+    "repeated_text": "reference keeps one run per distinct text, the other occurrences of a repeated "
+                     "run are reported as changed and common_a / common_b no longer pair up",
+}
+
+
+def get_alignment_violations(string_a, string_b, aligned):
+    """
+    Returns:
+        List[str]: Why `aligned` (output of get_common_missing_idx) is not a valid pairing, empty when it is
+    """
+    words_a = string_a.split(" ")
+    words_b = string_b.split(" ")
+    common_a, common_b, missing_a, missing_b, runs = aligned
+    violations = []
+
+    #~ Every token is either common or missing, exactly once
+    if sorted([*common_a, *missing_a]) != list(range(len(words_a))):
+        violations.append("tokens of a not covered exactly once")
+    if sorted([*common_b, *missing_b]) != list(range(len(words_b))):
+        violations.append("tokens of b not covered exactly once")
+
+    #~ Runs are increasing and disjoint on both sides, and made of equal tokens
+    end_a = end_b = 0
+    for text, start_a, stop_a, start_b, stop_b in runs:
+        if start_a < end_a or start_b < end_b:
+            violations.append(f"run {start_a}:{stop_a} / {start_b}:{stop_b} overlaps or goes back")
+        if words_a[start_a:stop_a] != words_b[start_b:stop_b] or text != " ".join(words_a[start_a:stop_a]):
+            violations.append(f"run {start_a}:{stop_a} / {start_b}:{stop_b} pairs different tokens")
+        end_a, end_b = stop_a, stop_b
+
+    #~ Common indices are exactly the run indices, paired index by index
+    run_a = [index for _, start_a, stop_a, _, _ in runs for index in range(start_a, stop_a)]
+    run_b = [index for _, _, _, start_b, stop_b in runs for index in range(start_b, stop_b)]
+    if list(common_a) != run_a or list(common_b) != run_b:
+        violations.append("common indices differ from the runs")
+    return violations
+
+
+def explain_difference(aligned, reference):
+    """
+    Returns:
+        str: Key of `KNOWN_DIFFERENCES` explaining why the reference differs, None when unexplained
+    """
+    runs = {tuple(run) for run in aligned[4]}
+    reference_runs = {tuple(run) for run in reference[4]}
+    if not reference_runs <= runs:
+        return None
+
+    dropped = runs - reference_runs
+    texts = [run[0] for run in aligned[4]]
+    if all(texts.count(run[0]) > 1 for run in dropped):
+        return "repeated_text"
+    if all(any(run[0] != other[0] and run[0] in other[0] for other in reference_runs) or texts.count(run[0]) > 1 for run in dropped):
+        return "substring_filter"
+    return None
+
+
+def time_call(function, *args, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        function(*args)
+        best = min(best, time.perf_counter() - started_at)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 50, 200, 500, 1000, 2000])
+    parser.add_argument("--cases", type=int, default=100, help="Random cells per size for the equivalence check")
+    parser.add_argument("--legacy-max-words", type=int, default=200, help="Largest cell given to the slow reference")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    #-- Equivalence: valid pairing everywhere, same masks as the reference on cells of distinct words
+    #~ unless the reference hits one of its known defects
+    print("== Equivalence ==")
+    failures = []
+    for n_words in [size for size in args.sizes if size <= args.legacy_max_words]:
+        same = 0
+        differences = dict.fromkeys(KNOWN_DIFFERENCES, 0)
+        for _ in range(args.cases):
+            words = make_cell(rng, n_words, unique_words=True)
+            string_a, string_b = " ".join(words), " ".join(make_correction(rng, words))
+            new = get_common_missing_idx(string_a, string_b)
+            old = legacy_get_common_missing_idx(string_a, string_b)
+            failures.extend((string_a, string_b, violation) for violation in get_alignment_violations(string_a, string_b, new))
+            if all(np.array_equal(new[k], old[k]) for k in range(4)):
+                same += 1
+                continue
+            reason = explain_difference(new, old)
+            if reason is None:
+                failures.append((string_a, string_b, "differs from the reference for no known reason"))
+            else:
+                differences[reason] += 1
+        explained = ", ".join(f"{reason} {count}" for reason, count in differences.items() if count) or "none"
+        print(f"{n_words:>5} words: identical to reference {same}/{args.cases}, known differences: {explained}")
+
+    #~ With repeated words the reference keeps one occurrence per substring and its common_a / common_b
+    #~ no longer pair up, the aligner must still return index-by-index pairs
+    repeated_valid_old = 0
+    for _ in range(args.cases):
+        words = make_cell(rng, 50, unique_words=False)
+        string_a, string_b = " ".join(words), " ".join(make_correction(rng, words))
+        new = get_common_missing_idx(string_a, string_b)
+        old = legacy_get_common_missing_idx(string_a, string_b)
+        failures.extend((string_a, string_b, violation) for violation in get_alignment_violations(string_a, string_b, new))
+        repeated_valid_old += is_valid_alignment(string_a, string_b, old[0], old[1])
+    print(f"repeated words (50): valid pairing reference {repeated_valid_old}/{args.cases}")
+
+    print("\nKnown differences with the reference:")
+    for reason, description in KNOWN_DIFFERENCES.items():
+        print(f"  {reason}: {description}")
+    if failures:
+        print(f"\nFAILED: {len(failures)} violations")
+        for string_a, string_b, violation in failures[:10]:
+            print(f"  {violation}\n    a: {string_a[:120]}\n    b: {string_b[:120]}")
+        sys.exit(1)
+    print("\nEvery alignment is a valid pairing")
+
+    #-- Benchmark
+    print("\n== Benchmark (best of 3, seconds) ==")
+    print(f"{'words':>6} {'aligner':>10} {'reference':>10} {'speedup':>8}")
+    for n_words in args.sizes:
+        words = make_cell(rng, n_words, unique_words=False)
+        string_a, string_b = " ".join(words), " ".join(make_correction(rng, words))
+        new_time = time_call(get_common_missing_idx, string_a, string_b)
+        if n_words <= args.legacy_max_words:
+            old_time = time_call(legacy_get_common_missing_idx, string_a, string_b, repeat=1)
+            print(f"{n_words:>6} {new_time:>10.5f} {old_time:>10.5f} {old_time / new_time:>7.0f}x")
+        else:
+            print(f"{n_words:>6} {new_time:>10.5f} {'skipped':>10} {'':>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""
+Local stand-in for the Azure OpenAI chat completions endpoint.
+
+Answers every grammar batch with "no error" items (full or diff-only protocol) and
+injects throttling and faults so the agent's request controllers can be exercised
+without touching the real deployment.
+
+Usage:
+    python tools/fake_azure_endpoint.py --port 8011 --throttle-rate 0.2 --retry-after 1
+
+    # 30% of requests answer 503, then a full outage between 10s and 40s after start
+    python tools/fake_azure_endpoint.py --error-rate 0.3 --error-status 503 --outage-start 10 --outage-duration 30
+
+    # .env of the agent
+    AZURE_ENDPOINT=http://127.0.0.1:8011
+    NO_PROXY=127.0.0.1
+"""
+import re
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeAzureState:
+    def __init__(self, args):
+        self.args = args
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.total_requests = 0
+        self.total_throttled = 0
+        self.total_errors = 0
+        self.connections = set()
+        self.started_at = time.monotonic()
+
+    def in_outage(self):
+        elapsed = time.monotonic() - self.started_at
+        return self.args.outage_duration > 0 and 0 <= elapsed - self.args.outage_start < self.args.outage_duration
+
+    def enter(self):
+        """
+        Returns:
+            str | None: "error", "throttled" or None for a normal answer
+        """
+        with self.lock:
+            self.total_requests += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            if self.in_outage() or random.random() < self.args.error_rate:
+                self.total_errors += 1
+                return "error"
+            overloaded = self.args.max_in_flight and self.in_flight > self.args.max_in_flight
+            if overloaded or random.random() < self.args.throttle_rate:
+                self.total_throttled += 1
+                return "throttled"
+            return None
+
+    def leave(self):
+        with self.lock:
+            self.in_flight -= 1
+
+    def report(self):
+        with self.lock:
+            return {
+                "total_requests": self.total_requests,
+                "total_throttled": self.total_throttled,
+                "total_errors": self.total_errors,
+                "in_outage": self.in_outage(),
+                "connections": len(self.connections),
+                "in_flight": self.in_flight,
+                "max_in_flight": self.max_in_flight,
+            }
+
+
+def build_completion(prompt):
+    text_ids = [int(text_id) for text_id in re.findall(r"'id': (\d+)", prompt)]
+    if '"changes"' in prompt:
+        # Diff-only protocol, every text is correct
+        content = json.dumps({"changes": []})
+    else:
+        content = json.dumps({
+            "data": [
+                {"text_id": text_id, "status": True, "fixed_text": "", "original_text": ""}
+                for text_id in text_ids
+            ]
+        })
+    prompt_tokens = len(prompt) // 4
+    completion_tokens = len(content) // 4
+    return {
+        "id": "chatcmpl-fake",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": "fake",
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop"
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens
+        }
+    }
+
+
+def make_handler(state):
+    class FakeAzureHandler(BaseHTTPRequestHandler):
+        # Keep-alive, so client connection reuse shows up in the "connections" stat
+        protocol_version = "HTTP/1.1"
+
+        def send_json(self, status, body, headers=None):
+            payload = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            self.send_json(200, state.report())
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            request_body = json.loads(self.rfile.read(length) or b"{}")
+            with state.lock:
+                state.connections.add(self.client_address)
+            fault = state.enter()
+            try:
+                time.sleep(state.args.latency)
+                if fault == "error":
+                    self.send_json(
+                        state.args.error_status,
+                        {"error": {"code": str(state.args.error_status), "message": "Injected server error."}}
+                    )
+                    return
+                if fault == "throttled":
+                    self.send_json(
+                        429,
+                        {"error": {"code": "429", "message": "Rate limit is exceeded."}},
+                        headers={"Retry-After": str(state.args.retry_after)}
+                    )
+                    return
+
+                messages = request_body.get("messages", [])
+                prompt = " ".join(str(message.get("content", "")) for message in messages)
+                self.send_json(200, build_completion(prompt))
+            finally:
+                state.leave()
+
+        def log_message(self, format, *args):
+            pass
+
+    return FakeAzureHandler
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8011)
+    parser.add_argument("--latency", type=float, default=0.5, help="Seconds spent on every request")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Probability of answering 429")
+    parser.add_argument("--max-in-flight", type=int, default=0, help="Answer 429 above this many concurrent requests (0 = off)")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds sent with a 429")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Probability of answering --error-status")
+    parser.add_argument("--error-status", type=int, default=500, help="Status code of injected server errors")
+    parser.add_argument("--outage-start", type=float, default=0.0, help="Seconds after start when every request fails")
+    parser.add_argument("--outage-duration", type=float, default=0.0, help="Length of the outage in seconds (0 = off)")
+    args = parser.parse_args()
+
+    state = FakeAzureState(args)
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(state))
+    print(f"Fake Azure endpoint on http://127.0.0.1:{args.port} (GET / for stats)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(state.report())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+import os
+import time
+import sqlite3
+import threading
+from utils.general import normalize_text
+from utils.history_handler import make_hash
+
+
+class CorrectionCache:
+    """
+    Persistent content-addressed cache of LLM corrections.
+
+    Each entry is keyed by a hash of the normalized cell text, the prompt template
+    and the deployment name, so a prompt or model change never serves stale results.
+    Texts differing only by leading / trailing whitespace share an entry, fixed texts are stored
+    stripped and the caller puts back the whitespace of the cell being corrected.
+    """
+    def __init__(
+        self,
+        name="correction_cache",
+        save_dir="save",
+        max_entries=200000,
+        max_age_days=30
+    ):
+        self.name = name
+        self.save_dir = save_dir
+        self.max_entries = max_entries
+        self.max_age_seconds = max_age_days * 24 * 60 * 60
+        self.lock = threading.Lock()
+        self.create_connection()
+
+    #-- BUILD
+    def create_connection(self):
+        cache_db_path = os.path.join(self.save_dir, "database", f"{self.name}.db")
+        self.connection = sqlite3.connect(cache_db_path, check_same_thread=False, timeout=10)
+        self.connection.execute("PRAGMA journal_mode=WAL;")
+        self.cursor = self.connection.cursor()
+        self.create_table()
+
+
+    def create_table(self):
+        # -- Correction Cache
+        CREATE_CORRECTION_CACHE_QUERY = """
+            CREATE TABLE IF NOT EXISTS CORRECTION_CACHE (
+                cacheKey TEXT PRIMARY KEY,
+                status BOOL,
+                fixedText TEXT,
+                createdAt REAL,
+                lastAccess REAL
+            );
+        """
+        self.cursor.execute(CREATE_CORRECTION_CACHE_QUERY)
+
+        CREATE_LAST_ACCESS_INDEX_QUERY = """
+            CREATE INDEX IF NOT EXISTS CORRECTION_CACHE_LAST_ACCESS
+            ON CORRECTION_CACHE (lastAccess);
+        """
+        self.cursor.execute(CREATE_LAST_ACCESS_INDEX_QUERY)
+        self.connection.commit()
+
+
+    #-- KEYS
+    def make_key(self, text, prompt, deployment):
+        return make_hash(f"{make_hash(prompt)}|{deployment}|{normalize_text(text)}")
+
+
+    #-- GET AND SET
+    def get_many(self, keys, chunk_size=500):
+        """
+        Look up cached corrections
+
+        Args:
+            keys (List[str]): Cache keys built with `make_key`
+            chunk_size (int): Number of keys per SELECT, kept under the SQLite variable limit
+
+        Returns:
+            Dict[str, dict]: Mapping cache key -> {"status": bool, "fixed_text": str}, hits only
+        """
+        now = time.time()
+        expired_before = now - self.max_age_seconds
+        unique_keys = list(dict.fromkeys(keys))
+        hits = {}
+
+        with self.lock:
+            for start_idx in range(0, len(unique_keys), chunk_size):
+                chunk_keys = unique_keys[start_idx: start_idx + chunk_size]
+                placeholders = ", ".join("?" * len(chunk_keys))
+                GET_CACHE_QUERY = f"""
+                    SELECT cacheKey, status, fixedText
+                    FROM CORRECTION_CACHE
+                    WHERE cacheKey IN ({placeholders}) AND createdAt >= ?
+                """
+                rows = self.cursor.execute(GET_CACHE_QUERY, (*chunk_keys, expired_before)).fetchall()
+                for cache_key, status, fixed_text in rows:
+                    hits[cache_key] = {
+                        "status": bool(status),
+                        "fixed_text": fixed_text
+                    }
+
+            TOUCH_CACHE_QUERY = """
+                UPDATE CORRECTION_CACHE
+                SET lastAccess = ?
+                WHERE cacheKey = ?
+            """
+            self.cursor.executemany(TOUCH_CACHE_QUERY, [(now, cache_key) for cache_key in hits])
+            self.connection.commit()
+        return hits
+
+
+    def set_many(self, entries):
+        """
+        Store corrections and apply eviction
+
+        Args:
+            entries (Dict[str, dict]): Mapping cache key -> {"status": bool, "fixed_text": str}
+        """
+        if not entries:
+            return
+
+        now = time.time()
+        SET_CACHE_QUERY = """
+            INSERT OR REPLACE INTO CORRECTION_CACHE
+            (cacheKey, status, fixedText, createdAt, lastAccess)
+            VALUES (?, ?, ?, ?, ?)
+        """
+        with self.lock:
+            self.cursor.executemany(
+                SET_CACHE_QUERY,
+                [
+                    (cache_key, bool(entry["status"]), entry["fixed_text"], now, now)
+                    for cache_key, entry in entries.items()
+                ]
+            )
+            self.connection.commit()
+        self.evict()
+
+
+    #-- EVICTION
+    def evict(self):
+        """Drop entries older than `max_age_days`, then the least recently used ones above `max_entries`"""
+        expired_before = time.time() - self.max_age_seconds
+        DELETE_EXPIRED_QUERY = """
+            DELETE FROM CORRECTION_CACHE
+            WHERE createdAt < ?
+        """
+        DELETE_LRU_QUERY = """
+            DELETE FROM CORRECTION_CACHE
+            WHERE cacheKey IN (
+                SELECT cacheKey
+                FROM CORRECTION_CACHE
+                ORDER BY lastAccess ASC
+                LIMIT ?
+            )
+        """
+        with self.lock:
+            self.cursor.execute(DELETE_EXPIRED_QUERY, (expired_before,))
+            total_entries = self.cursor.execute("SELECT COUNT(*) FROM CORRECTION_CACHE").fetchone()[0]
+            if total_entries > self.max_entries:
+                self.cursor.execute(DELETE_LRU_QUERY, (total_entries - self.max_entries,))
+            self.connection.commit()
+
+
+    def clear(self):
+        with self.lock:
+            self.cursor.execute("DELETE FROM CORRECTION_CACHE")
+            self.connection.commit()
@@ -7,6 +7,7 @@ import glob
 import yaml
 import os
 import sys
+import unicodedata
 import numpy as np
 
 from tqdm import tqdm
@@ -66,6 +67,19 @@ def update_dict(original: dict, updates: dict) -> dict:
     original.update(updates)
     return original
 
+def normalize_text(text) -> str:
+    """Canonical form of a cell value used for hashing and deduplication"""
+    return unicodedata.normalize("NFC", str(text)).strip()
+
+def restore_padding(text, fixed_text) -> str:
+    """`fixed_text` with the leading and trailing whitespace of `text`, texts sharing a normalized form differ only there"""
+    text = str(text)
+    core = text.strip()
+    if not core:
+        return text
+    start = len(text) - len(text.lstrip())
+    return text[:start] + str(fixed_text).strip() + text[start + len(core):]
+
 # ==== FUNCTION ====
 def read_html(html_path):
     with open(resource_path(html_path), 'r', encoding='utf-8') as file:
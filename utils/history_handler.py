@@ -54,6 +54,45 @@ class HistoryHandler:
         self.cursor.execute(CREATE_HISTORY_CORRECTION_QUERY)
         self.connection.commit()
 
+        # -- Grammar Check Jobs
+        CREATE_JOB_QUERY = """
+            CREATE TABLE IF NOT EXISTS JOB (
+                jobId TEXT PRIMARY KEY,
+                fileId INT,
+                localPath TEXT,
+                sheetName TEXT,
+                status TEXT,
+                batchesDone INT DEFAULT 0,
+                batchesTotal INT DEFAULT 0,
+                cellsCorrected INT DEFAULT 0,
+                error TEXT,
+                createdAt REAL,
+                startedAt REAL,
+                finishedAt REAL,
+
+                FOREIGN KEY (fileId) REFERENCES FILE(fileId) ON DELETE CASCADE
+            );
+        """
+        self.cursor.execute(CREATE_JOB_QUERY)
+        self.connection.commit()
+
+        # -- Cell Fingerprints of the last check
+        CREATE_CELL_FINGERPRINT_QUERY = """
+            CREATE TABLE IF NOT EXISTS CELL_FINGERPRINT (
+                fileId INT,
+                sheetName TEXT,
+                rowIndex INT,
+                colIndex INT,
+                textHash TEXT,
+                lastResult TEXT,
+
+                PRIMARY KEY (fileId, sheetName, rowIndex, colIndex),
+                FOREIGN KEY (fileId) REFERENCES FILE(fileId) ON DELETE CASCADE
+            );
+        """
+        self.cursor.execute(CREATE_CELL_FINGERPRINT_QUERY)
+        self.connection.commit()
+
 
     # ADD AND GET
     def get_table_len(self, table_name):
@@ -162,6 +201,7 @@ class HistoryHandler:
         self.connection.commit()
 
         self.delete_correction_history(file_id)
+        self.delete_cell_fingerprints(file_id)
 
 
     # ERROR CORRECTION HISTORY
@@ -169,11 +209,14 @@ class HistoryHandler:
         row_index, col_index = coordinates
         ic(f"Add history file_id: {file_id} - sheet_name: {sheet_name} - coordinates: {coordinates}")
 
-        # Add new
+        # Add new, a cell recorded by a concurrent check of the same sheet keeps its reject status
         ADD_CORRECTION_HISTORY_QUERY = """
             INSERT INTO ERROR_CORRECTION
             (fileId, sheetName, rowIndex, colIndex, oldValue, newValue, isReject)
             VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(fileId, sheetName, rowIndex, colIndex) DO UPDATE SET
+                oldValue = excluded.oldValue,
+                newValue = excluded.newValue
         """
 
         self.cursor.execute(
@@ -192,6 +235,18 @@ class HistoryHandler:
         self.connection.commit() 
 
 
+    def delete_cell_corrections(self, file_id, sheet_name, list_coordinates):
+        DELETE_CELL_CORRECTION_QUERY = """
+            DELETE FROM ERROR_CORRECTION
+            WHERE fileId = ? AND sheetName = ? AND rowIndex = ? AND colIndex = ?
+        """
+        self.cursor.executemany(
+            DELETE_CELL_CORRECTION_QUERY,
+            [(file_id, sheet_name, row_index, col_index) for row_index, col_index in list_coordinates]
+        )
+        self.connection.commit()
+
+
     def set_correction_reject_status(self, file_id, sheet_name, coordinates, status=False):
         row_index, col_index = coordinates
         SET_CORRECTION_STATUS_QUERY = f"""
@@ -218,6 +273,7 @@ class HistoryHandler:
             SELECT oldValue, newValue, rowIndex, colIndex, isReject
             FROM FILE, ERROR_CORRECTION
             WHERE FILE.localPathHash = '{local_path_hash}' AND ERROR_CORRECTION.sheetName = '{sheet_name}'
+                AND FILE.fileId = ERROR_CORRECTION.fileId
         """
 
         rows = self.cursor.execute(GET_CORRECTION_HISTORY_QUERY).fetchall()
@@ -235,7 +291,169 @@ class HistoryHandler:
         return []
 
 
+    def get_accepted_corrections(self, file_id, sheet_name=None):
+        """Non-rejected corrections of a sheet, or of every sheet when `sheet_name` is None"""
+        GET_ACCEPTED_CORRECTIONS_QUERY = """
+            SELECT sheetName, rowIndex, colIndex, oldValue, newValue
+            FROM ERROR_CORRECTION
+            WHERE fileId = ? AND NOT COALESCE(isReject, 0)
+        """
+        params = [file_id]
+        if sheet_name is not None:
+            GET_ACCEPTED_CORRECTIONS_QUERY += " AND sheetName = ?"
+            params.append(sheet_name)
+        GET_ACCEPTED_CORRECTIONS_QUERY += " ORDER BY sheetName, rowIndex, colIndex"
+
+        rows = self.cursor.execute(GET_ACCEPTED_CORRECTIONS_QUERY, params).fetchall()
+        return [
+            {
+                "sheet_name": row[0],
+                "coordinates": (row[1], row[2]),
+                "cell": convert_coor_to_cell_string(row[1], row[2]),
+                "old_value": row[3],
+                "new_value": row[4]
+            }
+            for row in rows
+        ]
+
+
+    # CELL FINGERPRINTS
+    def get_cell_fingerprints(self, file_id, sheet_name):
+        GET_CELL_FINGERPRINTS_QUERY = """
+            SELECT rowIndex, colIndex, textHash
+            FROM CELL_FINGERPRINT
+            WHERE fileId = ? AND sheetName = ?
+        """
+        rows = self.cursor.execute(GET_CELL_FINGERPRINTS_QUERY, (file_id, sheet_name)).fetchall()
+        return {(row_index, col_index): text_hash for row_index, col_index, text_hash in rows}
+
+
+    def set_cell_fingerprints(self, file_id, fingerprints):
+        """
+        Args:
+            fingerprints (List[Tuple]): (sheet_name, (row_index, col_index), text_hash, last_result) of checked cells
+        """
+        SET_CELL_FINGERPRINT_QUERY = """
+            INSERT OR REPLACE INTO CELL_FINGERPRINT
+            (fileId, sheetName, rowIndex, colIndex, textHash, lastResult)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """
+        self.cursor.executemany(
+            SET_CELL_FINGERPRINT_QUERY,
+            [
+                (file_id, sheet_name, row_index, col_index, text_hash, last_result)
+                for sheet_name, (row_index, col_index), text_hash, last_result in fingerprints
+            ]
+        )
+        self.connection.commit()
+
+
+    def delete_cell_fingerprints(self, file_id, sheet_name=None, list_coordinates=None):
+        if sheet_name is None:
+            self.cursor.execute("DELETE FROM CELL_FINGERPRINT WHERE fileId = ?", (file_id,))
+        else:
+            DELETE_CELL_FINGERPRINT_QUERY = """
+                DELETE FROM CELL_FINGERPRINT
+                WHERE fileId = ? AND sheetName = ? AND rowIndex = ? AND colIndex = ?
+            """
+            self.cursor.executemany(
+                DELETE_CELL_FINGERPRINT_QUERY,
+                [(file_id, sheet_name, row_index, col_index) for row_index, col_index in list_coordinates]
+            )
+        self.connection.commit()
+
+
+    # GRAMMAR CHECK JOBS
+    def add_job(self, job_id, file_id, local_path, sheet_name, created_at):
+        ADD_JOB_QUERY = """
+            INSERT INTO JOB (jobId, fileId, localPath, sheetName, status, createdAt)
+            VALUES (?, ?, ?, ?, 'queued', ?)
+        """
+        self.cursor.execute(ADD_JOB_QUERY, (job_id, file_id, local_path, sheet_name, created_at))
+        self.connection.commit()
+
+
+    def set_job_status(self, job_id, status, error=None, started_at=None, finished_at=None):
+        SET_JOB_STATUS_QUERY = """
+            UPDATE JOB
+            SET status = ?,
+                error = COALESCE(?, error),
+                startedAt = COALESCE(?, startedAt),
+                finishedAt = COALESCE(?, finishedAt)
+            WHERE jobId = ?
+        """
+        self.cursor.execute(SET_JOB_STATUS_QUERY, (status, error, started_at, finished_at, job_id))
+        self.connection.commit()
+
+
+    def update_job_progress(self, job_id, batches_done, batches_total, cells_corrected):
+        UPDATE_JOB_PROGRESS_QUERY = """
+            UPDATE JOB
+            SET batchesDone = ?, batchesTotal = ?, cellsCorrected = ?
+            WHERE jobId = ?
+        """
+        self.cursor.execute(UPDATE_JOB_PROGRESS_QUERY, (batches_done, batches_total, cells_corrected, job_id))
+        self.connection.commit()
+
+
+    def get_job(self, job_id):
+        GET_JOB_QUERY = """
+            SELECT jobId, fileId, localPath, sheetName, status, batchesDone, batchesTotal,
+                   cellsCorrected, error, createdAt, startedAt, finishedAt
+            FROM JOB
+            WHERE jobId = ?
+        """
+        row = self.cursor.execute(GET_JOB_QUERY, (job_id,)).fetchone()
+        if not row:
+            return None
+        return format_job(row)
+
+
+    def get_file_jobs(self, file_id):
+        GET_FILE_JOBS_QUERY = """
+            SELECT jobId, fileId, localPath, sheetName, status, batchesDone, batchesTotal,
+                   cellsCorrected, error, createdAt, startedAt, finishedAt
+            FROM JOB
+            WHERE fileId = ?
+            ORDER BY createdAt DESC
+        """
+        rows = self.cursor.execute(GET_FILE_JOBS_QUERY, (file_id,)).fetchall()
+        return [format_job(row) for row in rows]
+
+
+    def fail_interrupted_jobs(self, finished_at):
+        """Jobs still queued or running belong to a previous process and will never finish"""
+        FAIL_INTERRUPTED_JOBS_QUERY = """
+            UPDATE JOB
+            SET status = 'failed', error = 'Interrupted by server restart', finishedAt = ?
+            WHERE status IN ('queued', 'running')
+        """
+        self.cursor.execute(FAIL_INTERRUPTED_JOBS_QUERY, (finished_at,))
+        self.connection.commit()
+
+
 # UTILS
+def format_job(row):
+    (
+        job_id, file_id, local_path, sheet_name, status, batches_done, batches_total,
+        cells_corrected, error, created_at, started_at, finished_at
+    ) = row
+    return {
+        "job_id": job_id,
+        "file_id": file_id,
+        "local_path": local_path,
+        "sheet_name": sheet_name,
+        "status": status,
+        "batches_done": batches_done,
+        "batches_total": batches_total,
+        "cells_corrected": cells_corrected,
+        "error": error,
+        "created_at": created_at,
+        "started_at": started_at,
+        "finished_at": finished_at,
+    }
+
+
 def make_hash(text: str) -> str:
     return hashlib.sha256(text.encode("utf-8")).hexdigest()
 
@@ -0,0 +1,101 @@
+from utils.chatbot import format_corrections
+from utils.history_handler import make_hash
+
+
+def make_cell_hash(value) -> str:
+    return make_hash(str(value))
+
+
+def get_recheck_cells(history_handler, file_id, text_cells, sheet_names):
+    """
+    Compare every cell with the fingerprints of the last check, only new or modified cells are re-checked.
+    Corrections and fingerprints of modified or cleared cells are dropped, unchanged cells keep
+    their corrections and reject status.
+
+    `text_cells` is consumed in a single pass, each text is hashed once and only the cells to
+    re-check are kept, still grouped by text.
+
+    Args:
+        history_handler (HistoryHandler): History database
+        file_id (int): File id
+        text_cells (Iterable[Tuple[str, List[Tuple[str, Tuple[int, int]]]]]): every text and the (sheet_name, (x, y)) of its cells
+        sheet_names (List[str]): Sheets covered by `text_cells`, a sheet without any cell left is cleared
+
+    Returns:
+        List[Tuple[str, List[Tuple[str, Tuple[int, int]]]]]: texts and cells to check
+    """
+    fingerprints = {
+        sheet_name: history_handler.get_cell_fingerprints(file_id, sheet_name)
+        for sheet_name in sheet_names
+    }
+    #~ Fingerprinted cells not seen again were emptied since the last check
+    unseen_coordinates = {sheet_name: set(sheet_fingerprints) for sheet_name, sheet_fingerprints in fingerprints.items()}
+    stale_coordinates = {sheet_name: [] for sheet_name in sheet_names}
+
+    recheck_cells = []
+    for text, cells in text_cells:
+        text_hash = make_cell_hash(text)
+        changed_cells = []
+        for sheet_name, coordinates in cells:
+            unseen_coordinates[sheet_name].discard(coordinates)
+            if fingerprints[sheet_name].get(coordinates) != text_hash:
+                changed_cells.append((sheet_name, coordinates))
+                stale_coordinates[sheet_name].append(coordinates)
+        if changed_cells:
+            recheck_cells.append((text, changed_cells))
+
+    for sheet_name in sheet_names:
+        stale_coordinates[sheet_name].extend(unseen_coordinates[sheet_name])
+        history_handler.delete_cell_corrections(file_id, sheet_name, stale_coordinates[sheet_name])
+        history_handler.delete_cell_fingerprints(file_id, sheet_name, stale_coordinates[sheet_name])
+    return recheck_cells
+
+
+def iter_recheck(agent, history_handler, file_id, text_cells, chunks=None):
+    """
+    Check `text_cells` (texts and their cells, as returned by `get_recheck_cells`) with the agent,
+    recording corrections and fingerprints chunk by chunk
+
+    Args:
+        chunks (LoopStream, optional): `agent.stream_text_cells(text_cells)` opened by the caller,
+            e.g. to cancel it from another thread
+
+    Yields:
+        dict: {"results": [...], "batches_done": int, "batches_total": int, "retries": int}
+    """
+    if chunks is None:
+        chunks = agent.stream_text_cells(text_cells)
+    text_hashes = {}
+    try:
+        for chunk in chunks:
+            results = format_corrections(chunk["corrections"])
+            for result in results:
+                history_handler.add_correction_history(
+                    file_id=file_id,
+                    sheet_name=result["sheet_name"],
+                    coordinates=result["coordinates"],
+                    old_value=result["old_value"],
+                    new_value=result["new_value"]
+                )
+
+            new_values = {
+                (result["sheet_name"], result["coordinates"]): result["new_value"]
+                for result in results
+            }
+            fingerprints = []
+            for sheet_name, coordinates, value in chunk["checked_cells"]:
+                text_hash = text_hashes.get(value)
+                if text_hash is None:
+                    text_hash = text_hashes[value] = make_cell_hash(value)
+                fingerprints.append((sheet_name, coordinates, text_hash, new_values.get((sheet_name, coordinates))))
+            history_handler.set_cell_fingerprints(file_id, fingerprints)
+
+            yield {
+                "results": results,
+                "batches_done": chunk["batches_done"],
+                "batches_total": chunk["batches_total"],
+                "retries": chunk.get("retries", 0)
+            }
+    finally:
+        # Closing the stream aborts the batches still pending
+        chunks.close()
@@ -0,0 +1,200 @@
+import time
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor, CancelledError
+
+from utils.workbook_cache import WorkbookCache
+from utils.history_handler import HistoryHandler
+from utils.incremental_check import get_recheck_cells, iter_recheck
+
+
+class JobConflictError(Exception):
+    """Raised by `submit` when a queued or running job already covers the same file and sheets"""
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        super().__init__(f"Grammar job {job_id} is already checking this file")
+
+
+class GrammarJobManager:
+    def __init__(self, agent, history_handler, writer, max_workers=2, workbook_cache=None):
+        """
+        In-process worker pool running grammar checks as jobs persisted in the JOB table
+
+        Args:
+            agent (GramCheckerAgent): Agent checking the sheets
+            history_handler (HistoryHandler): Handler used by the Flask threads
+            writer (Logger): Logger
+            max_workers (int): Number of jobs running at the same time
+            workbook_cache (WorkbookCache): Parsed sheets shared with the Flask threads, a private one-entry cache when None
+        """
+        self.agent = agent
+        self.history_handler = history_handler
+        self.writer = writer
+        self.workbook_cache = workbook_cache or WorkbookCache(max_entries=1)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="grammar-job")
+        self.thread_local = threading.local()
+        self.lock = threading.Lock()
+        self.jobs = {}
+
+        self.history_handler.fail_interrupted_jobs(finished_at=time.time())
+
+
+    def get_worker_history_handler(self):
+        # Every worker thread gets its own sqlite connection
+        if not hasattr(self.thread_local, "history_handler"):
+            self.thread_local.history_handler = HistoryHandler(
+                name=self.history_handler.name,
+                save_dir=self.history_handler.save_dir
+            )
+        return self.thread_local.history_handler
+
+
+    #-- SUBMIT AND CANCEL
+    def submit(self, local_path, sheet_name=None):
+        """
+        Queue a check of one sheet, or of the whole workbook when `sheet_name` is None
+
+        Two checks of the same sheet would record the same cells concurrently, a job overlapping a
+        queued or running one (same sheet, or any sheet of a file whose workbook is being checked)
+        is refused.
+
+        Returns:
+            str: Job id
+
+        Raises:
+            JobConflictError: A job already covers this file and sheet
+        """
+        job_id = uuid.uuid4().hex
+        file_id = self.history_handler.get_file_id(local_path)
+        cancel_event = threading.Event()
+        with self.lock:
+            for other_id, other in self.jobs.items():
+                if other["file_id"] == file_id and (sheet_name is None or other["sheet_name"] in (None, sheet_name)):
+                    raise JobConflictError(other_id)
+            #~ Reserved before the lock is released, a concurrent submit of the same sheet sees it
+            self.jobs[job_id] = {"cancel_event": cancel_event, "future": None, "file_id": file_id, "sheet_name": sheet_name}
+
+        try:
+            self.history_handler.add_job(
+                job_id=job_id,
+                file_id=file_id,
+                local_path=local_path,
+                sheet_name=sheet_name,
+                created_at=time.time()
+            )
+        except Exception:
+            with self.lock:
+                self.jobs.pop(job_id, None)
+            raise
+        with self.lock:
+            self.jobs[job_id]["future"] = self.executor.submit(
+                self.run_job, job_id, file_id, local_path, sheet_name, cancel_event
+            )
+        target = f"sheet {sheet_name}" if sheet_name else "the whole workbook"
+        self.writer.LOG_INFO(f"Queued grammar job {job_id} for {target}")
+        return job_id
+
+
+    def cancel(self, job_id):
+        """
+        Cancel a queued or running job. A running job's stream is cancelled on the agent's event loop:
+        the batches in flight, retry backoffs and circuit breaker waits are aborted, batches already
+        recorded are kept
+
+        Returns:
+            bool: False if the job is unknown or already finished
+        """
+        with self.lock:
+            job = self.jobs.get(job_id)
+        if job is None or job["future"] is None:
+            return False
+
+        job["cancel_event"].set()
+        if job["future"].cancel():
+            # Never started, the worker will not record anything
+            self.history_handler.set_job_status(job_id, "cancelled", finished_at=time.time())
+            with self.lock:
+                self.jobs.pop(job_id, None)
+        else:
+            with self.lock:
+                stream = job.get("stream")
+            if stream is not None:
+                stream.cancel()
+        self.writer.LOG_INFO(f"Cancel requested for grammar job {job_id}")
+        return True
+
+
+    #-- PROGRESS
+    def get_progress(self, job_id):
+        job = self.history_handler.get_job(job_id)
+        if job is None:
+            return None
+
+        job["eta_seconds"] = None
+        if job["status"] == "running" and job["batches_done"] and job["started_at"]:
+            elapsed = time.time() - job["started_at"]
+            remaining = job["batches_total"] - job["batches_done"]
+            job["eta_seconds"] = round(elapsed / job["batches_done"] * remaining, 1)
+        return job
+
+
+    #-- WORKER
+    def run_job(self, job_id, file_id, local_path, sheet_name, cancel_event):
+        history_handler = self.get_worker_history_handler()
+        try:
+            if cancel_event.is_set():
+                history_handler.set_job_status(job_id, "cancelled", finished_at=time.time())
+                return
+
+            history_handler.set_job_status(job_id, "running", started_at=time.time())
+            sheet_names = [sheet_name] if sheet_name else self.workbook_cache.get_sheet_names(local_path)
+
+            # Only new or modified cells are sent, the others keep their corrections
+            text_cells = get_recheck_cells(
+                history_handler,
+                file_id,
+                self.workbook_cache.iter_text_cells(local_path, sheet_names),
+                sheet_names
+            )
+            cell_count = sum(len(cells) for _, cells in text_cells)
+            self.writer.LOG_INFO(f"Grammar job {job_id}: {cell_count} new or modified cells ({len(text_cells)} texts) to check")
+            cells_corrected = 0
+            stream = self.agent.stream_text_cells(text_cells)
+            with self.lock:
+                self.jobs[job_id]["stream"] = stream
+            #~ A cancel landing before the stream was registered
+            if cancel_event.is_set():
+                stream.cancel()
+            chunks = iter_recheck(self.agent, history_handler, file_id, text_cells, chunks=stream)
+            try:
+                for chunk in chunks:
+                    cells_corrected += len(chunk["results"])
+                    history_handler.update_job_progress(
+                        job_id=job_id,
+                        batches_done=chunk["batches_done"],
+                        batches_total=chunk["batches_total"],
+                        cells_corrected=cells_corrected
+                    )
+                    if cancel_event.is_set():
+                        history_handler.set_job_status(job_id, "cancelled", finished_at=time.time())
+                        self.writer.LOG_INFO(f"Grammar job {job_id} cancelled")
+                        return
+            finally:
+                # Closing the stream aborts the batches still pending
+                chunks.close()
+
+            history_handler.set_job_status(job_id, "done", finished_at=time.time())
+            self.writer.LOG_INFO(f"Grammar job {job_id} done, {cells_corrected} cells corrected")
+
+        except CancelledError:
+            history_handler.set_job_status(job_id, "cancelled", finished_at=time.time())
+            self.writer.LOG_INFO(f"Grammar job {job_id} cancelled")
+
+        except Exception as e:
+            self.writer.LOG_ERROR(f"Grammar job {job_id} failed: {str(e)}")
+            history_handler.set_job_status(job_id, "failed", error=str(e), finished_at=time.time())
+
+        finally:
+            with self.lock:
+                self.jobs.pop(job_id, None)
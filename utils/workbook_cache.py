@@ -0,0 +1,187 @@
+import os
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import List
+
+from utils.xlsx_scanner import scan_workbook_strings, read_sheet_names
+
+
+def estimate_text_cells_size(texts, text_cells) -> int:
+    """Rough memory footprint of scanned texts and their (sheet_name, (x, y)) cells, in bytes"""
+    size = sys.getsizeof(texts) + sys.getsizeof(text_cells)
+    for text, cells in zip(texts, text_cells):
+        size += sys.getsizeof(text) + sys.getsizeof(cells)
+        #~ Sheet names are shared strings, only the tuples and the coordinates are counted
+        size += len(cells) * (sys.getsizeof(("", (0, 0))) + sys.getsizeof((0, 0)) + 2 * sys.getsizeof(0))
+    return size
+
+
+class WorkbookCache:
+    """
+    In-process LRU cache of the text cells and sheet names of workbooks, grouped by text.
+
+    Entries are keyed by (local_path, mtime, size), a file written since it was parsed is never
+    served from the cache. Concurrent requests for the same file share a single parse. The least
+    recently used workbooks are dropped once the estimated memory of the entries exceeds `max_bytes`.
+    Cached cells are shared between callers and must not be modified.
+
+    Examples:
+        workbook_cache = WorkbookCache(max_bytes=512 * 1024 * 1024)
+        sheet_names = workbook_cache.get_sheet_names("report.xlsx")
+        for text, cells in workbook_cache.iter_text_cells("report.xlsx", ["Sheet1"]):
+            ...
+        workbook_cache.invalidate("report.xlsx")
+
+    Disabled, every call scans the file again and nothing is kept.
+    """
+    def __init__(self, max_bytes=512 * 1024 * 1024, max_entries=16, enable=True):
+        self.enable = enable
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.sheet_names = {}
+        self.loading = {}
+        self.total_bytes = 0
+        self.stats = {"hits": 0, "misses": 0, "shared": 0, "evictions": 0}
+        self.lock = threading.Lock()
+
+
+    #-- KEYS
+    def make_key(self, local_path):
+        local_path = os.path.abspath(local_path)
+        stat = os.stat(local_path)
+        return (local_path, stat.st_mtime_ns, stat.st_size)
+
+
+    #-- GET
+    def get_sheet_names(self, local_path) -> List[str]:
+        """Sheet names, read without parsing any sheet when the workbook is not cached yet"""
+        key = self.make_key(local_path)
+        with self.lock:
+            if key in self.entries:
+                return list(self.entries[key]["sheet_names"])
+            if key in self.sheet_names:
+                return list(self.sheet_names[key])
+
+        sheet_names = self.read_sheet_names(key[0])
+        with self.lock:
+            self.drop_path(key[0], keep_key=key)
+            self.sheet_names[key] = sheet_names
+        return list(sheet_names)
+
+
+    def iter_text_cells(self, local_path, sheet_names=None):
+        """
+        Args:
+            local_path (str): Workbook path
+            sheet_names (List[str]): Sheets to read, every sheet when None
+
+        Yields:
+            Tuple[str, List[Tuple[str, Tuple[int, int]]]]: every unique text and the (sheet_name, (x, y)) of its cells
+        """
+        if not self.enable:
+            texts, text_cells = scan_workbook_strings(local_path, sheet_names)
+            yield from zip(texts, text_cells)
+            return
+
+        entry = self.get_entry(local_path)
+        if sheet_names is None:
+            yield from zip(entry["texts"], entry["text_cells"])
+            return
+
+        sheet_names = set(sheet_names)
+        for text, cells in zip(entry["texts"], entry["text_cells"]):
+            cells = [cell for cell in cells if cell[0] in sheet_names]
+            if cells:
+                yield text, cells
+
+
+    def read_sheet_names(self, local_path) -> List[str]:
+        return read_sheet_names(local_path)
+
+
+    def get_entry(self, local_path) -> dict:
+        key = self.make_key(local_path)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return entry
+
+            future = self.loading.get(key)
+            is_owner = future is None
+            if is_owner:
+                future = Future()
+                self.loading[key] = future
+                self.stats["misses"] += 1
+            else:
+                self.stats["shared"] += 1
+
+        #~ Another request is parsing the same file, wait for its result
+        if not is_owner:
+            return future.result()
+
+        try:
+            entry = self.parse(key[0])
+        except BaseException as e:
+            with self.lock:
+                self.loading.pop(key, None)
+            future.set_exception(e)
+            raise
+
+        with self.lock:
+            self.loading.pop(key, None)
+            self.drop_path(key[0], keep_key=key)
+            self.entries[key] = entry
+            self.total_bytes += entry["size"]
+            self.evict()
+        future.set_result(entry)
+        return entry
+
+
+    def parse(self, local_path) -> dict:
+        # Only text cells are kept, read straight from sharedStrings.xml and the sheet XML
+        texts, text_cells = scan_workbook_strings(local_path)
+        return {
+            "sheet_names": self.read_sheet_names(local_path),
+            "texts": texts,
+            "text_cells": text_cells,
+            "size": estimate_text_cells_size(texts, text_cells)
+        }
+
+
+    #-- INVALIDATION
+    def invalidate(self, local_path):
+        """Drop every entry of `local_path`, called after the file was written"""
+        with self.lock:
+            self.drop_path(os.path.abspath(local_path))
+
+
+    def drop_path(self, local_path, keep_key=None):
+        # Lock held by the caller
+        for key in [key for key in self.entries if key[0] == local_path and key != keep_key]:
+            self.total_bytes -= self.entries.pop(key)["size"]
+        for key in [key for key in self.sheet_names if key[0] == local_path and key != keep_key]:
+            del self.sheet_names[key]
+
+
+    def evict(self):
+        # Lock held by the caller, the newest entry is kept even when it alone exceeds the cap
+        while len(self.entries) > 1 and (self.total_bytes > self.max_bytes or len(self.entries) > self.max_entries):
+            _, entry = self.entries.popitem(last=False)
+            self.total_bytes -= entry["size"]
+            self.stats["evictions"] += 1
+
+
+    def get_state(self) -> dict:
+        with self.lock:
+            return {
+                "enable": self.enable,
+                "entries": len(self.entries),
+                "total_bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+                **self.stats
+            }
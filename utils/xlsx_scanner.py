@@ -0,0 +1,235 @@
+import re
+import html
+import codecs
+import posixpath
+import zipfile
+import xml.etree.ElementTree as ET
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+from openpyxl.utils.escape import unescape
+
+
+MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+PACKAGE_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+
+SI_TAG = f"{{{MAIN_NS}}}si"
+T_TAG = f"{{{MAIN_NS}}}t"
+R_TAG = f"{{{MAIN_NS}}}r"
+ROW_TAG = f"{{{MAIN_NS}}}row"
+CELL_TAG = f"{{{MAIN_NS}}}c"
+VALUE_TAG = f"{{{MAIN_NS}}}v"
+INLINE_TAG = f"{{{MAIN_NS}}}is"
+SHEET_TAG = f"{{{MAIN_NS}}}sheet"
+RELATIONSHIP_TAG = f"{{{PACKAGE_REL_NS}}}Relationship"
+
+CELL_REFERENCE_PATTERN = re.compile(r"([A-Z]+)(\d+)")
+#~ Fast path on the raw sheet XML: only cells with a string type are looked at. Every writer puts the
+#~ reference first, a cell without it (or with another attribute first) switches to the XML parser
+CELL_PATTERN = re.compile(
+    r'<c r="([A-Z]+)(\d+)"(?=[^>]*?\bt="(s|str|inlineStr)")[^>]*?(?:/>|>(.*?)</c>)',
+    re.DOTALL
+)
+UNREFERENCED_CELL_PATTERN = re.compile(r'<c(?=[\s>/])(?!\s+r=")')
+ROW_START_PATTERN = re.compile(r"<row(?=[\s>/])")
+VALUE_PATTERN = re.compile(r"<v>([^<]*)</v>")
+
+
+@lru_cache(maxsize=None)
+def column_to_index(letters: str) -> int:
+    index = 0
+    for char in letters:
+        index = index * 26 + ord(char) - 64
+    return index - 1
+
+
+#-- PACKAGE
+def get_workbook_parts(archive: zipfile.ZipFile) -> Tuple[Dict[str, str], str]:
+    """
+    Returns:
+        Tuple[Dict[str, str], str]: Mapping sheet name -> worksheet member (workbook order), sharedStrings member or None
+    """
+    relationships = ET.fromstring(archive.read("xl/_rels/workbook.xml.rels"))
+    targets = {}
+    shared_strings_member = None
+    for relationship in relationships.iter(RELATIONSHIP_TAG):
+        target = relationship.get("Target")
+        member = target.lstrip("/") if target.startswith("/") else posixpath.normpath(posixpath.join("xl", target))
+        targets[relationship.get("Id")] = member
+        if relationship.get("Type", "").endswith("/sharedStrings"):
+            shared_strings_member = member
+
+    workbook = ET.fromstring(archive.read("xl/workbook.xml"))
+    sheet_members = {
+        sheet.get("name"): targets[sheet.get(f"{{{REL_NS}}}id")]
+        for sheet in workbook.iter(SHEET_TAG)
+        if targets.get(sheet.get(f"{{{REL_NS}}}id"), "").startswith("xl/worksheets/")
+    }
+    return sheet_members, shared_strings_member
+
+
+def read_string_item(item) -> str:
+    """Plain text of a <si> / <is> element: its own <t> or the <t> of its runs, phonetic runs left out"""
+    parts = [child.text or "" for child in item if child.tag == T_TAG]
+    for run in item.iter(R_TAG):
+        parts.extend(t.text or "" for t in run.iter(T_TAG))
+    return unescape("".join(parts))
+
+
+def read_shared_strings(archive: zipfile.ZipFile, member: str) -> List[str]:
+    """Every shared string, in index order, streamed with iterparse"""
+    if member is None:
+        return []
+    shared_strings = []
+    with archive.open(member) as source:
+        for _, element in ET.iterparse(source, events=("end",)):
+            if element.tag == SI_TAG:
+                shared_strings.append(read_string_item(element))
+                element.clear()
+    return shared_strings
+
+
+#-- SHEETS
+def iter_sheet_strings(archive: zipfile.ZipFile, member: str, block_size: int = 1 << 22):
+    """
+    Text cells of one worksheet, without building any cell object
+
+    The sheet XML is read in blocks cut at row boundaries and string cells are matched with a regex,
+    numbers and empty cells are never parsed. Cells are yielded block by block. Sheets written with
+    a namespace prefix fall back to `iterparse_sheet_strings`, and so does the rest of a sheet from
+    the first block holding a cell without reference (rows already yielded are skipped).
+
+    Yields:
+        Tuple[Tuple[int, int], str, Any]: ((x, y), kind, payload), kind "s" with the shared string
+            index as payload, "inline" with the text itself (inline strings and formula string results)
+    """
+    rows_done = 0
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    with archive.open(member) as source:
+        head = decoder.decode(source.read(4096))
+        if re.search(r"<\w+:worksheet\b", head):
+            yield from iterparse_sheet_strings(archive, member)
+            return
+
+        pending = head
+        while True:
+            block = source.read(block_size)
+            data = pending + decoder.decode(block, final=not block)
+            cut = data.rfind("</row>") + len("</row>") if block else len(data)
+            if cut < len("</row>"):
+                pending = data
+                continue
+            pending = data[cut:]
+            rows = data[:cut]
+            if UNREFERENCED_CELL_PATTERN.search(rows):
+                yield from iterparse_sheet_strings(archive, member, skip_rows=rows_done)
+                return
+            rows_done += len(ROW_START_PATTERN.findall(rows))
+
+            for column, row, cell_type, content in CELL_PATTERN.findall(rows):
+                coordinates = (int(row) - 1, column_to_index(column))
+                if cell_type == "s":
+                    # Shared string cells are "<v>index</v>", anything else goes through the value regex
+                    if content.startswith("<v>") and content.endswith("</v>"):
+                        yield coordinates, "s", int(content[3:-4])
+                    else:
+                        value = VALUE_PATTERN.search(content)
+                        if value is not None:
+                            yield coordinates, "s", int(value.group(1))
+                elif cell_type == "str":
+                    value = VALUE_PATTERN.search(content)
+                    if value is not None and value.group(1):
+                        # Line ends are normalized by XML parsers before entities are resolved
+                        text = value.group(1).replace("\r\n", "\n").replace("\r", "\n")
+                        yield coordinates, "inline", html.unescape(text)
+                elif content:
+                    inline = ET.fromstring(f'<c xmlns="{MAIN_NS}">{content}</c>').find(INLINE_TAG)
+                    if inline is not None:
+                        yield coordinates, "inline", read_string_item(inline)
+            if not block:
+                break
+
+
+def iterparse_sheet_strings(archive: zipfile.ZipFile, member: str, skip_rows: int = 0):
+    """Same output as `iter_sheet_strings`, with a full XML parse of the sheet, the first `skip_rows` rows left out"""
+    x = -1
+    y = -1
+    row_count = 0
+    with archive.open(member) as source:
+        for event, element in ET.iterparse(source, events=("start", "end")):
+            tag = element.tag
+            if event == "start":
+                if tag == ROW_TAG:
+                    row_count += 1
+                    row_reference = element.get("r")
+                    x = int(row_reference) - 1 if row_reference else x + 1
+                    y = -1
+                elif tag == CELL_TAG:
+                    reference = element.get("r")
+                    match = CELL_REFERENCE_PATTERN.match(reference) if reference else None
+                    y = column_to_index(match.group(1)) if match else y + 1
+                continue
+
+            if tag == CELL_TAG:
+                cell_type = element.get("t") if row_count > skip_rows else None
+                if cell_type == "s":
+                    value = element.find(VALUE_TAG)
+                    if value is not None and value.text is not None:
+                        yield (x, y), "s", int(value.text)
+                elif cell_type == "inlineStr":
+                    inline = element.find(INLINE_TAG)
+                    if inline is not None:
+                        yield (x, y), "inline", read_string_item(inline)
+                elif cell_type == "str":
+                    value = element.find(VALUE_TAG)
+                    if value is not None and value.text is not None:
+                        yield (x, y), "inline", value.text
+                element.clear()
+            elif tag == ROW_TAG:
+                element.clear()
+
+
+def scan_workbook_strings(path: str, sheet_names=None) -> Tuple[List[str], List[List[Tuple[str, Tuple[int, int]]]]]:
+    """
+    Unique texts of a workbook and the cells holding each of them, read straight from the zip members
+
+    Shared strings are already stored once per workbook, inline strings are deduplicated here.
+    Only strings used by the scanned sheets are returned.
+
+    Args:
+        path (str): .xlsx / .xlsm path
+        sheet_names (List[str], optional): Sheets to scan, every sheet when None
+
+    Returns:
+        Tuple[List[str], List[List[Tuple[str, Tuple[int, int]]]]]: unique texts, and for each text the
+            (sheet_name, (x, y)) of its cells
+
+    Examples:
+        texts, text_cells = scan_workbook_strings("report.xlsx")
+        # texts[0] == "Teh system shall log every fault", text_cells[0] == [("Sheet1", (3, 1)), ("Sheet2", (7, 1))]
+    """
+    with zipfile.ZipFile(path) as archive:
+        sheet_members, shared_strings_member = get_workbook_parts(archive)
+        shared_strings = read_shared_strings(archive, shared_strings_member)
+
+        text_positions = {}
+        texts = []
+        text_cells = []
+        for sheet_name in (list(sheet_members) if sheet_names is None else sheet_names):
+            for coordinates, kind, payload in iter_sheet_strings(archive, sheet_members[sheet_name]):
+                text = shared_strings[payload] if kind == "s" else payload
+                position = text_positions.get(text)
+                if position is None:
+                    position = text_positions[text] = len(texts)
+                    texts.append(text)
+                    text_cells.append([])
+                text_cells[position].append((sheet_name, coordinates))
+    return texts, text_cells
+
+
+def read_sheet_names(path: str) -> List[str]:
+    """Names of the worksheets of a workbook, in workbook order, chartsheets left out"""
+    with zipfile.ZipFile(path) as archive:
+        sheet_members, _ = get_workbook_parts(archive)
+    return list(sheet_members)